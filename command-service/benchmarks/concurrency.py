@@ -0,0 +1,90 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/concurrency.py
+# DESCRIÇÃO: Mede a vazão de requisições concorrentes em POST /command/.
+#
+# Para reproduzir o cenário "log-service lento", suba um stand-in local:
+#   python benchmarks/concurrency.py --serve-log-service --log-delay 0.2
+# Em outro terminal, o command-service apontando para ele:
+#   LOG_SERVICE_URL=http://localhost:8013 PERSISTENCE_SERVICE_URL=http://localhost:8013 \
+#   ACCESS_EVENTS_ENABLED=false uvicorn main:app --port 8004
+# (o stand-in também responde à verificação de permissão, sempre liberando)
+# E então dispare a carga:
+#   python benchmarks/concurrency.py --requests 500 --concurrency 50
+# -----------------------------------------------------------------------------
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def run_load(url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        f"{url}/command/",
+                        json={"mac_address": f"bench:{i % 64:02x}", "command": "abrir"},
+                        headers={"X-User-ID": str(i % 100 + 1), "X-User-Role": "padrao"},
+                    )
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000
+    print(f"{total} requisições, concorrência {concurrency}: {total / elapsed:.1f} req/s "
+          f"p50={pick(0.5):.1f}ms p99={pick(0.99):.1f}ms erros={errors}")
+
+
+def serve_log_service(port, delay):
+    """Stand-in do log-service que demora `delay` segundos para responder."""
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    app = FastAPI(title="Log Service (stand-in lento)")
+
+    @app.post("/log/", status_code=201)
+    @app.post("/logs/batch", status_code=201)
+    async def receive(request: Request):
+        await request.body()
+        await asyncio.sleep(delay)
+        return {"status": "ok"}
+
+    @app.get("/internal/check-permission/")
+    async def check_permission():
+        return {"allowed": True, "room_id": 1}
+
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência do Command Service")
+    parser.add_argument("--url", default="http://localhost:8004")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--serve-log-service", action="store_true")
+    parser.add_argument("--log-port", type=int, default=8013)
+    parser.add_argument("--log-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.serve_log_service:
+        serve_log_service(args.log_port, args.log_delay)
+    else:
+        asyncio.run(run_load(args.url, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
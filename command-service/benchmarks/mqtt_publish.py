@@ -0,0 +1,84 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/mqtt_publish.py
+# DESCRIÇÃO: Compara a publicação MQTT com uma conexão nova por comando (modelo
+# antigo) contra o publicador persistente. Requer um broker local, ex:
+#   docker run -p 1883:1883 eclipse-mosquitto
+#   python benchmarks/mqtt_publish.py --messages 500
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import sys
+import time
+
+import paho.mqtt.client as mqtt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mqtt_publisher import MqttPublisher  # noqa: E402
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(round(p * (len(samples) - 1))))] * 1000
+    return f"p50={pick(0.5):.2f}ms p99={pick(0.99):.2f}ms max={pick(1.0):.2f}ms"
+
+
+def bench_connect_per_message(host, port, messages):
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        client.connect(host, port, 60)
+        client.publish(f"portas/bench-{i}/command", "abrir")
+        client.disconnect()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_persistent(host, port, messages, qos):
+    # TTL folgado: o benchmark enfileira tudo de uma vez.
+    publisher = MqttPublisher(host, port, qos=qos, max_queue=messages, command_ttl=300)
+    publisher.start()
+    deadline = time.monotonic() + 10
+    while not publisher.connected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if not publisher.connected:
+        raise SystemExit(f"Não foi possível conectar ao broker em {host}:{port}")
+
+    latencies = []
+    for i in range(messages):
+        start = time.perf_counter()
+        publisher.publish(f"portas/bench-{i}/command", "abrir")
+        latencies.append(time.perf_counter() - start)
+
+    while publisher.stats.published < messages and time.monotonic() < deadline + 30:
+        time.sleep(0.01)
+    metrics = publisher.metrics()
+    publisher.stop()
+    return latencies, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de publicação MQTT")
+    parser.add_argument("--host", default=os.environ.get("MQTT_BROKER_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MQTT_BROKER_PORT", 1883)))
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--qos", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"--- Benchmark MQTT ({args.messages} mensagens, broker {args.host}:{args.port}) ---")
+
+    start = time.perf_counter()
+    old = bench_connect_per_message(args.host, args.port, args.messages)
+    elapsed = time.perf_counter() - start
+    print(f"Conexão por comando : {args.messages / elapsed:8.1f} msg/s  {percentiles(old)}")
+
+    start = time.perf_counter()
+    new, metrics = bench_persistent(args.host, args.port, args.messages, args.qos)
+    elapsed = time.perf_counter() - start
+    print(f"Publicador persistente: {args.messages / elapsed:8.1f} msg/s  enfileirar {percentiles(new)}")
+    print(f"  confirmação do broker: {metrics['latency_ms']}")
+    print(f"  contadores: publicadas={metrics['published']} descartadas={metrics['dropped']} falhas={metrics['failed']}")
+
+
+if __name__ == "__main__":
+    main()
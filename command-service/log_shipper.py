@@ -0,0 +1,246 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: log_shipper.py
+# DESCRIÇÃO: Envio de logs "fire-and-forget" para o Log Service. As requisições
+# apenas enfileiram o log; uma task em segundo plano os envia em lotes, e o que
+# não puder ser entregue (log-service fora do ar) vai para um arquivo de spill
+# em disco ou é descartado, conforme a política configurada. Logs que o
+# log-service recusa como inválidos (4xx) são descartados e contados em
+# 'rejected': reenviá-los nunca daria certo.
+# -----------------------------------------------------------------------------
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+OVERFLOW_SPILL = "spill"
+OVERFLOW_DROP = "drop"
+
+
+class LogShipper:
+    """
+    Fila limitada de logs drenada por uma task asyncio.
+
+    Um lote é enviado quando atinge `batch_size` entradas ou quando
+    `flush_interval` segundos se passam desde a primeira entrada do lote.
+    Após uma falha de envio o shipper espera (backoff exponencial) antes de
+    tentar o log-service de novo; nesse meio tempo os lotes vão direto para a
+    política de overflow, sem pagar o timeout a cada lote.
+    """
+
+    def __init__(self, base_url, max_queue=10000, batch_size=100, flush_interval=1.0,
+                 overflow=OVERFLOW_SPILL, spill_path="log_spill.ndjson",
+                 spill_max_bytes=50 * 1024 * 1024, max_backoff=30.0, max_replay_failures=5):
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.max_backoff = max_backoff
+        self.max_replay_failures = max_replay_failures
+
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        # Lote em montagem/envio e entradas do spill ainda não reenviadas: ficam
+        # na instância para que `stop` as entregue se a task for cancelada.
+        self._batch = []
+        self._replaying = []
+        self._client = None
+        self._task = None
+        self._failures = 0
+        self._replay_failures = 0  # falhas seguidas do primeiro lote do spill
+        self._retry_at = 0.0
+        self.stats = {"submitted": 0, "shipped": 0, "dropped": 0, "rejected": 0, "spilled": 0, "replayed": 0,
+                      "failed_batches": 0}
+
+    # --- Ciclo de vida ---
+
+    async def start(self, client: httpx.AsyncClient):
+        self._client = client
+        self._task = asyncio.create_task(self._run(), name="log-shipper")
+
+    async def stop(self, timeout=5.0):
+        """
+        Cancela o loop e tenta entregar (ou fazer spill) do que restou: o lote
+        que estava sendo montado ou enviado, o reenvio do spill interrompido e
+        a fila.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        remaining = self._batch + self._replaying
+        self._batch, self._replaying = [], []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for start in range(0, len(remaining), self.batch_size):
+            batch = remaining[start:start + self.batch_size]
+            try:
+                await asyncio.wait_for(self._deliver(batch), timeout)
+            except asyncio.TimeoutError:
+                await self._overflow(batch)
+
+    # --- API pública ---
+
+    def submit(self, entry: dict):
+        """Enfileira um log sem bloquear. Com a fila cheia, o log é descartado."""
+        entry.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    def metrics(self):
+        data = dict(self.stats)
+        data["queue_depth"] = self._queue.qsize()
+        data["queue_capacity"] = self._queue.maxsize
+        data["overflow_policy"] = self.overflow
+        data["spill_bytes"] = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+        return data
+
+    # --- Internos ---
+
+    async def _run(self):
+        while True:
+            batch = self._batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            delivered = await self._deliver(batch)
+            self._batch = []
+            if delivered and self._failures == 0:
+                await self._replay_spill()
+
+    async def _deliver(self, batch):
+        """Envia um lote; em caso de falha aplica a política de overflow."""
+        if time.monotonic() < self._retry_at:
+            await self._overflow(batch)
+            return False
+
+        delivered, failed = await self._send(batch)
+        self.stats["shipped"] += delivered
+        if not failed:
+            self._failures = 0
+            return True
+
+        self.stats["failed_batches"] += 1
+        self._failures += 1
+        self._retry_at = time.monotonic() + min(self.max_backoff, 2 ** (self._failures - 1))
+        await self._overflow(failed)
+        return False
+
+    async def _send(self, batch, split_invalid=True):
+        """
+        Envia o lote ao log-service. Devolve (entregues, entradas a tentar de
+        novo); só falhas de transporte e erros 5xx voltam para nova tentativa.
+        """
+        try:
+            response = await self._client.post(f"{self.base_url}/logs/batch", json=batch)
+        except httpx.HTTPError as e:
+            print(f"ERRO: Não foi possível enviar lote de logs para o Log Service: {e}")
+            return 0, batch
+        if response.status_code < 400:
+            return len(batch), []
+        if response.status_code >= 500:
+            print(f"ERRO: Log Service recusou lote de {len(batch)} logs (HTTP {response.status_code}).")
+            # O lote é gravado em uma única transação: ou entra inteiro, ou nada entra.
+            return 0, batch
+
+        # 4xx: o lote é inválido. Se o 422 apontar as entradas culpadas, só elas
+        # são descartadas e o resto é reenviado uma vez.
+        invalid = self._invalid_positions(response, len(batch)) if split_invalid else set()
+        if invalid and len(invalid) < len(batch):
+            self.stats["rejected"] += len(invalid)
+            print(f"ERRO: Log Service rejeitou {len(invalid)} de {len(batch)} logs (HTTP {response.status_code}).")
+            return await self._send([entry for i, entry in enumerate(batch) if i not in invalid], split_invalid=False)
+        self.stats["rejected"] += len(batch)
+        print(f"ERRO: Log Service rejeitou lote de {len(batch)} logs (HTTP {response.status_code}); lote descartado.")
+        return 0, []
+
+    @staticmethod
+    def _invalid_positions(response, size):
+        """Posições das entradas inválidas segundo o 'detail' de um 422 do FastAPI (loc = ["body", i, ...])."""
+        if response.status_code != 422:
+            return set()
+        try:
+            errors = response.json()["detail"]
+            positions = {error["loc"][1] for error in errors if error["loc"][0] == "body"}
+        except (ValueError, KeyError, IndexError, TypeError):
+            return set()
+        if not all(isinstance(position, int) and 0 <= position < size for position in positions):
+            return set()
+        return positions
+
+    async def _overflow(self, entries):
+        if self.overflow == OVERFLOW_SPILL and await asyncio.to_thread(self._spill, entries):
+            self.stats["spilled"] += len(entries)
+        else:
+            self.stats["dropped"] += len(entries)
+
+    def _spill(self, entries):
+        size = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else 0
+        if size >= self.spill_max_bytes:
+            return False
+        with open(self.spill_path, "a", encoding="utf-8") as spill:
+            for entry in entries:
+                spill.write(json.dumps(entry) + "\n")
+        return True
+
+    def _should_give_up(self, failed):
+        """
+        O reenvio só roda depois de um envio bem-sucedido; falhas seguidas
+        dele indicam um lote que nunca será aceito, não o log-service fora.
+        """
+        self._replay_failures += 1
+        if self._replay_failures < self.max_replay_failures:
+            return False
+        self._replay_failures = 0
+        return True
+
+    def _take_spill(self):
+        """Move o arquivo de spill para fora do caminho e devolve suas entradas."""
+        if not os.path.exists(self.spill_path):
+            return []
+        replay_path = f"{self.spill_path}.replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path, encoding="utf-8") as spill:
+            entries = [json.loads(line) for line in spill if line.strip()]
+        os.remove(replay_path)
+        return entries
+
+    async def _replay_spill(self):
+        """Reenvia os logs que ficaram em disco enquanto o log-service estava fora."""
+        entries = self._replaying = await asyncio.to_thread(self._take_spill)
+        for start in range(0, len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            delivered, failed = await self._send(batch)
+            self.stats["replayed"] += delivered
+            # Devolve ao disco o que falhou e o que ainda não foi tentado.
+            rest = self._replaying = failed + entries[start + self.batch_size:]
+            if not failed:
+                self._replay_failures = 0
+            elif self._should_give_up(failed):
+                # O log-service aceita lotes novos mas recusa sempre este: desiste dele.
+                print(f"ERRO: Lote de {len(failed)} logs do spill falhou {self.max_replay_failures} vezes; descartado.")
+                self.stats["dropped"] += len(failed)
+                self._replaying = entries[start + self.batch_size:]
+            else:
+                if not await asyncio.to_thread(self._spill, rest):
+                    self.stats["dropped"] += len(rest)
+                self._replaying = []
+                self._failures += 1
+                self._retry_at = time.monotonic() + min(self.max_backoff, 2 ** (self._failures - 1))
+                return
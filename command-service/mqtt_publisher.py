@@ -0,0 +1,229 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: mqtt_publisher.py
+# DESCRIÇÃO: Publicador MQTT persistente do Command Service. Mantém uma única
+# conexão com o broker (com reconexão automática) e uma fila de saída limitada,
+# evitando um handshake TCP/MQTT completo a cada comando de porta.
+#
+# Um comando de porta só faz sentido logo após ser pedido: sem conexão com o
+# broker o publicador recusa comandos novos, e os que já estavam na fila
+# expiram depois de `command_ttl` segundos em vez de abrir uma porta minutos
+# depois, quando a conexão voltar.
+# -----------------------------------------------------------------------------
+import queue
+import threading
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+
+class PublisherStats:
+    """Contadores de publicação, expostos pelo endpoint de métricas."""
+
+    def __init__(self, latency_window=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self.enqueued = 0
+        self.published = 0
+        self.dropped = 0
+        self.expired = 0
+        self.discarded = 0
+        self.failed = 0
+        self.connects = 0
+        self.disconnects = 0
+
+    def incr(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self.published += 1
+            self._latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = {
+                "enqueued": self.enqueued,
+                "published": self.published,
+                "dropped": self.dropped,
+                "expired": self.expired,
+                "discarded": self.discarded,
+                "failed": self.failed,
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 3)
+
+        counters["latency_ms"] = {
+            "samples": len(latencies),
+            "p50": percentile(0.50),
+            "p99": percentile(0.99),
+            "max": percentile(1.0),
+        }
+        return counters
+
+
+class MqttPublisher:
+    """
+    Cliente MQTT de longa duração.
+
+    O loop de rede do paho roda em uma thread própria (loop_start) e cuida da
+    reconexão com backoff exponencial. Os comandos entram numa fila limitada e
+    uma thread de despacho os entrega ao cliente apenas enquanto há conexão;
+    com a fila cheia ou sem conexão, `publish` recusa o comando em vez de
+    bloquear a requisição. Comandos que esperam na fila mais que `command_ttl`
+    segundos são descartados (contador 'expired').
+    """
+
+    def __init__(self, host, port, keepalive=60, qos=1, max_queue=1000,
+                 min_backoff=1, max_backoff=30, client_id="", command_ttl=5.0):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.qos = qos
+        self.command_ttl = command_ttl
+        self.stats = PublisherStats()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._connected = threading.Event()
+        self._stopping = threading.Event()
+        self._dispatcher = None
+
+        # Relaciona o 'mid' de cada mensagem ao instante em que entrou na fila.
+        # O broker pode confirmar antes de `publish` retornar, por isso as
+        # confirmações adiantadas ficam guardadas até o despachante registrá-las.
+        self._track_lock = threading.Lock()
+        self._inflight = {}
+        self._early_acks = {}
+
+        self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        self._client.reconnect_delay_set(min_delay=min_backoff, max_delay=max_backoff)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_publish = self._on_publish
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Inicia a conexão assíncrona, o loop de rede e a thread de despacho."""
+        self._stopping.clear()
+        self._client.connect_async(self.host, self.port, self.keepalive)
+        self._client.loop_start()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="mqtt-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self, timeout=5.0):
+        """Tenta esvaziar a fila dentro de `timeout` segundos e encerra a conexão."""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and self._connected.is_set() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stopping.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(max(0.0, deadline - time.monotonic()))
+        self._client.disconnect()
+        self._client.loop_stop()
+        discarded = 0
+        while True:
+            try:
+                topic, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            discarded += 1
+            print(f"AVISO: Comando MQTT para '{topic}' descartado no encerramento.")
+        if discarded:
+            self.stats.incr("discarded", discarded)
+
+    # --- API pública ---
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def publish(self, topic, payload):
+        """
+        Enfileira uma mensagem para publicação. Nunca bloqueia: retorna False
+        se não houver conexão com o broker ou se a fila de saída estiver cheia.
+        """
+        if not self.connected:
+            self.stats.incr("dropped")
+            return False
+        try:
+            self._queue.put_nowait((topic, payload, time.perf_counter()))
+        except queue.Full:
+            self.stats.incr("dropped")
+            return False
+        self.stats.incr("enqueued")
+        return True
+
+    def metrics(self):
+        data = self.stats.snapshot()
+        data["connected"] = self.connected
+        data["queue_depth"] = self.queue_depth()
+        data["queue_capacity"] = self._queue.maxsize
+        return data
+
+    # --- Internos ---
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            # Enquanto não há conexão os comandos aguardam na fila limitada.
+            if not self._connected.wait(timeout=0.5):
+                continue
+            try:
+                topic, payload, enqueued_at = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if time.perf_counter() - enqueued_at > self.command_ttl:
+                # A conexão caiu com o comando na fila: tarde demais para entregá-lo.
+                self.stats.incr("expired")
+                print(f"AVISO: Comando MQTT para '{topic}' expirou na fila e foi descartado.")
+                continue
+
+            info = self._client.publish(topic, payload, qos=self.qos)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS and self.qos == 0:
+                # Com QoS 0 o paho descarta a mensagem se a conexão caiu;
+                # com QoS > 0 ela fica retida e é reenviada na reconexão.
+                self.stats.incr("failed")
+                continue
+            self._track(info.mid, enqueued_at)
+
+    def _track(self, mid, enqueued_at):
+        with self._track_lock:
+            acked_at = self._early_acks.pop(mid, None)
+            if acked_at is None:
+                self._inflight[mid] = enqueued_at
+                return
+        self.stats.record_latency(acked_at - enqueued_at)
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        now = time.perf_counter()
+        with self._track_lock:
+            enqueued_at = self._inflight.pop(mid, None)
+            if enqueued_at is None:
+                self._early_acks[mid] = now
+                return
+        self.stats.record_latency(now - enqueued_at)
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"ERRO: Broker MQTT recusou a conexão: {reason_code}")
+            return
+        self.stats.incr("connects")
+        self._connected.set()
+        print(f"Conectado ao broker MQTT em {self.host}:{self.port}")
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._connected.clear()
+        self.stats.incr("disconnects")
+        if not self._stopping.is_set():
+            print(f"AVISO: Conexão MQTT perdida ({reason_code}). Reconectando...")
@@ -0,0 +1,192 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: permission_cache.py
+# DESCRIÇÃO: Cache das decisões de permissão (usuário, MAC) vindas do
+# Persistence Service. É um LRU limitado com TTL, invalidado por eventos: o
+# Persistence Service publica no exchange fanout 'access_events' toda mudança
+# de acesso (salas, membros, dispositivos) e uma thread deste serviço consome
+# esses eventos e descarta as entradas afetadas.
+#
+# Sem a conexão com o RabbitMQ as invalidações se perderiam, então o cache
+# fica desligado (toda verificação vai ao Persistence Service) até ela voltar.
+# -----------------------------------------------------------------------------
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pika
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    room_id: int | None  # None: MAC não cadastrado
+
+
+class PermissionCache:
+    def __init__(self, ttl=30.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (user_id, mac) -> (expira_em, Decision)
+        self._lock = threading.Lock()
+        self._generation = 0  # incrementado a cada invalidação
+        self.live = False  # só usa o cache enquanto as invalidações chegam
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidated": 0, "resets": 0}
+
+    def generation(self):
+        """Marca a ser passada a `put`: descarta resultados buscados antes de uma invalidação."""
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key) if self.live else None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, decision = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return decision
+
+    def put(self, key, decision: Decision, generation: int):
+        with self._lock:
+            if not self.live or generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, room_ids=(), user_ids=(), macs=()):
+        """Remove as entradas de qualquer uma das salas, usuários ou MACs informados."""
+        room_ids, user_ids, macs = set(room_ids), set(user_ids), set(macs)
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key for key, (_, decision) in self._entries.items()
+                if key[0] in user_ids or key[1] in macs or decision.room_id in room_ids
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.stats["resets"] += 1
+
+    def set_live(self, live: bool):
+        """Liga/desliga o cache (desligar também o esvazia)."""
+        self.clear()
+        self.live = live
+
+    def metrics(self):
+        with self._lock:
+            data = dict(self.stats)
+            data["entries"] = len(self._entries)
+        data["live"] = self.live
+        data["ttl_s"] = self.ttl
+        data["capacity"] = self.max_entries
+        return data
+
+
+class AccessEventListener:
+    """
+    Thread que consome 'access_events' e invalida o PermissionCache. Qualquer
+    falha (broker fora, erro de rede, bug ao tratar um evento) derruba só a
+    conexão atual: a thread registra o erro e reconecta com backoff
+    exponencial. `connect` devolve (conexão, canal) já consumindo a fila; é
+    substituível nos testes.
+    """
+
+    def __init__(self, url, exchange, cache: PermissionCache, min_backoff=1.0, max_backoff=30.0, connect=None):
+        self.url = url
+        self.exchange = exchange
+        self.cache = cache
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._connect = connect or self._open_channel
+        self._stopping = threading.Event()
+        self._thread = None
+        self._connection = None
+        self._channel = None
+        self.stats = {"connects": 0, "errors": 0}
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="access-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        connection, channel = self._connection, self._channel
+        if connection is not None and channel is not None:
+            try:
+                connection.add_callback_threadsafe(channel.stop_consuming)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open_channel(self):
+        connection = pika.BlockingConnection(pika.URLParameters(self.url))
+        channel = connection.channel()
+        channel.exchange_declare(exchange=self.exchange, exchange_type="fanout", durable=True)
+        # Fila exclusiva por instância: cada réplica do serviço recebe todos os eventos.
+        queue = channel.queue_declare(queue="", exclusive=True).method.queue
+        channel.queue_bind(exchange=self.exchange, queue=queue)
+        channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=True)
+        return connection, channel
+
+    def _run(self):
+        backoff = self.min_backoff
+        while not self._stopping.is_set():
+            try:
+                self._connection, self._channel = self._connect()
+                self.stats["connects"] += 1
+                backoff = self.min_backoff
+                # Eventos podem ter sido perdidos enquanto estávamos desconectados.
+                self.cache.set_live(True)
+                print(f"Cache de permissões ativo (ouvindo '{self.exchange}').")
+                self._channel.start_consuming()
+            except Exception as e:
+                # Não só AMQPError: um erro inesperado não pode matar a thread
+                # e deixar o cache desligado para sempre.
+                if not self._stopping.is_set():
+                    self.stats["errors"] += 1
+                    print(f"AVISO: Sem conexão com o RabbitMQ ({type(e).__name__}: {e}); "
+                          f"cache de permissões desligado, reconectando em {backoff} s.")
+            finally:
+                self.cache.set_live(False)
+                connection, self._connection, self._channel = self._connection, None, None
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+            self._stopping.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _on_message(self, channel, method, properties, body):
+        try:
+            event = json.loads(body)
+        except json.JSONDecodeError:
+            print(f"AVISO: Evento de acesso inválido descartado: {body!r}")
+            return
+        if event.get("event_type") == "access_changed":
+            self.cache.invalidate(
+                room_ids=event.get("room_ids", ()),
+                user_ids=event.get("user_ids", ()),
+                macs=event.get("macs", ()),
+            )
+        else:
+            # 'access_reset' (índice reconstruído) ou evento desconhecido: esvazia tudo.
+            self.cache.clear()
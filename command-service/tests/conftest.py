@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do serviço são importados pelo nome (como no uvicorn main:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
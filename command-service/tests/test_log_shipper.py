@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import httpx
+
+from log_shipper import LogShipper
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_shipper(tmp_path, handler, **options):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    options.setdefault("flush_interval", 60)  # lotes só fecham pelo tamanho ou no stop
+    shipper = LogShipper("http://log-service", spill_path=str(tmp_path / "spill.ndjson"), **options)
+    return shipper, client
+
+
+def entry(i):
+    return {"service_name": "command-service", "message": f"log {i}"}
+
+
+def test_stop_delivers_batch_in_progress(tmp_path):
+    received = []
+
+    def handler(request):
+        received.extend(json.loads(request.content))
+        return httpx.Response(201, json={})
+
+    async def scenario():
+        shipper, client = make_shipper(tmp_path, handler, batch_size=100)
+        await shipper.start(client)
+        for i in range(5):
+            shipper.submit(entry(i))
+        await asyncio.sleep(0.05)  # o loop já tirou os logs da fila e espera o lote encher
+        await shipper.stop()
+        return shipper.metrics()
+
+    metrics = run(scenario())
+    assert metrics["shipped"] == 5
+    assert [log["message"] for log in received] == [f"log {i}" for i in range(5)]
+
+
+def test_stop_spills_batch_when_log_service_is_down(tmp_path):
+    def handler(request):
+        raise httpx.ConnectError("log-service fora do ar", request=request)
+
+    async def scenario():
+        shipper, client = make_shipper(tmp_path, handler, batch_size=100)
+        await shipper.start(client)
+        for i in range(5):
+            shipper.submit(entry(i))
+        await asyncio.sleep(0.05)
+        await shipper.stop()
+        return shipper.metrics()
+
+    metrics = run(scenario())
+    assert (metrics["shipped"], metrics["spilled"]) == (0, 5)
+    assert len((tmp_path / "spill.ndjson").read_text().splitlines()) == 5
+
+
+def test_invalid_entries_are_rejected_without_spilling(tmp_path):
+    stored = []
+
+    def handler(request):
+        batch = json.loads(request.content)
+        invalid = [
+            {"loc": ["body", i, "mac_address"], "msg": "too long"}
+            for i, log in enumerate(batch) if len(log.get("mac_address") or "") > 17
+        ]
+        if invalid:
+            return httpx.Response(422, json={"detail": invalid})
+        stored.extend(batch)
+        return httpx.Response(201, json={})
+
+    async def scenario():
+        shipper, client = make_shipper(tmp_path, handler, batch_size=10)
+        await shipper.start(client)
+        shipper.submit({**entry(0), "mac_address": "x" * 40})
+        for i in range(1, 20):
+            shipper.submit(entry(i))
+        await asyncio.sleep(0.05)
+        await shipper.stop()
+        return shipper.metrics()
+
+    metrics = run(scenario())
+    assert (metrics["shipped"], metrics["rejected"], metrics["spilled"]) == (19, 1, 0)
+    assert len(stored) == 19
+
+
+def test_replay_gives_up_on_a_batch_that_always_fails(tmp_path):
+    spill = tmp_path / "spill.ndjson"
+    spill.write_text("".join(json.dumps(log) + "\n" for log in [{**entry(0), "message": "veneno"}, entry(1)]))
+
+    def handler(request):
+        batch = json.loads(request.content)
+        if any(log["message"] == "veneno" for log in batch):
+            return httpx.Response(500)
+        return httpx.Response(201, json={})
+
+    async def scenario():
+        shipper, client = make_shipper(tmp_path, handler, batch_size=1, max_backoff=0.001, max_replay_failures=3)
+        await shipper.start(client)
+        for i in range(2, 12):
+            shipper.submit(entry(i))
+            await asyncio.sleep(0.01)
+        await shipper.stop()
+        return shipper.metrics()
+
+    metrics = run(scenario())
+    assert metrics["replayed"] == 1
+    assert metrics["dropped"] == 1
+    assert not spill.exists() or "veneno" not in spill.read_text()
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from permission_cache import AccessEventListener, PermissionCache
+
+
+class FakeConnection:
+    is_open = True
+
+    def add_callback_threadsafe(self, callback):
+        callback()
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeChannel:
+    """Consome até stop_consuming, ou levanta `error` logo ao começar."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self._stopped = threading.Event()
+
+    def start_consuming(self):
+        if self.error is not None:
+            raise self.error
+        self._stopped.wait(5)
+
+    def stop_consuming(self):
+        self._stopped.set()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_listener_survives_unexpected_errors():
+    cache = PermissionCache()
+    failures = [RuntimeError("bug ao conectar"), ValueError("bug ao consumir")]
+
+    def connect():
+        failure = failures.pop(0) if failures else None
+        if failure is not None and not isinstance(failure, ValueError):
+            raise failure
+        return FakeConnection(), FakeChannel(error=failure)
+
+    listener = AccessEventListener("amqp://", "access_events", cache, min_backoff=0.01, max_backoff=0.02,
+                                   connect=connect)
+    listener.start()
+    try:
+        # Um erro fora de AMQPError no connect e outro durante o consumo: a thread continua.
+        assert wait_until(lambda: listener.stats["connects"] == 2 and cache.live)
+        assert listener.stats["errors"] == 2
+        assert listener._thread.is_alive()
+    finally:
+        listener.stop()
+    assert not listener._thread.is_alive()
+    assert not cache.live
+
+
+def test_backoff_grows_until_the_limit():
+    waits = []
+    listener = AccessEventListener("amqp://", "access_events", PermissionCache(), min_backoff=1, max_backoff=4,
+                                   connect=lambda: (_ for _ in ()).throw(OSError("recusada")))
+
+    def wait(seconds):
+        waits.append(seconds)
+        if len(waits) == 5:
+            listener._stopping.set()
+        return listener._stopping.is_set()
+
+    listener._stopping.wait = wait
+    listener._run()
+    assert waits == [1, 2, 4, 4, 4]
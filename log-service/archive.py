@@ -0,0 +1,263 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: archive.py
+# DESCRIÇÃO: Camada fria dos logs. Partições mais antigas que
+# LOG_ARCHIVE_AFTER_DAYS são gravadas em arquivos de segmento no disco e então
+# removidas do banco.
+#
+# Cada segmento é um NDJSON comprimido (zstd se o pacote 'zstandard' estiver
+# instalado, senão gzip), em ordem cronológica e dividido em blocos comprimidos
+# de forma independente. Os blocos concatenados continuam sendo um .zst/.gz
+# válido, legível por zstdcat/zcat. Ao lado de cada segmento fica um índice
+# pequeno ('.idx.json') com o intervalo de tempo do segmento e de cada bloco.
+#
+# Os segmentos nunca são alterados: se um período já arquivado receber logs
+# atrasados, o próximo arquivamento cria um segmento novo para ele. A leitura
+# mapeia o arquivo em memória (mmap) e descomprime só os blocos cujo intervalo
+# cruza o da consulta; segmentos fora do intervalo nem são abertos.
+# -----------------------------------------------------------------------------
+import json
+import mmap
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+
+import models
+import partitions
+from database import settings
+from partitions import to_utc
+from queries import LogFilters
+
+try:
+    import zstandard
+except ImportError:  # dependência opcional
+    zstandard = None
+
+CODEC_ZSTD = "zstd"
+CODEC_GZIP = "gzip"
+EXTENSIONS = {CODEC_ZSTD: ".ndjson.zst", CODEC_GZIP: ".ndjson.gz"}
+INDEX_SUFFIX = ".idx.json"
+
+_indexes = {}  # cache dos índices lidos (segmentos são imutáveis)
+
+
+# --- Compressão ---
+
+def default_codec() -> str:
+    return CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=settings.LOG_ARCHIVE_ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(level=6, wbits=31)  # wbits=31: membro gzip completo
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(codec: str, data) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Segmento zstd exige o pacote 'zstandard'.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, wbits=31)
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# --- Escrita ---
+
+def _segment_path(archive_dir: str, partition: str, codec: str) -> str:
+    """Próximo nome livre para um segmento da partição: <partição>-<n><extensão>."""
+    n = 0
+    while True:
+        path = os.path.join(archive_dir, f"{partition}-{n:03d}{EXTENSIONS[codec]}")
+        if not os.path.exists(path + INDEX_SUFFIX):
+            return path
+        n += 1
+
+
+def _publish(tmp: str, path: str):
+    """
+    Publica um arquivo temporário já sincronizado em disco (rename atômico):
+    o nome final nunca aponta para um arquivo pela metade.
+    """
+    os.replace(tmp, path)
+    directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _lock_partition(conn, name: str):
+    """Bloqueia escritas na partição até o fim da transação (leituras continuam)."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE"))
+    else:
+        # No SQLite, qualquer escrita obtém a trava de escrita do banco.
+        conn.execute(text(f"DELETE FROM {name} WHERE 0"))
+
+
+def archive_partition(conn, name: str, archive_dir: str, codec: str | None = None) -> dict | None:
+    """
+    Grava a partição `name` em um segmento e a remove do banco, na transação
+    de `conn`. O segmento é publicado antes do commit: uma falha no meio do
+    caminho pode deixar logs duplicados (banco e arquivo), nunca perdidos.
+    Devolve o índice do segmento, ou None se a partição estava vazia.
+    """
+    codec = codec or default_codec()
+    _lock_partition(conn, name)
+    table = partitions.partition_table(name)
+    rows = conn.execution_options(stream_results=True, yield_per=settings.LOG_ARCHIVE_BLOCK_ROWS).execute(
+        select(table).order_by(table.c.timestamp, table.c.id)
+    )
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = _segment_path(archive_dir, name, codec)
+    blocks, offset = [], 0
+    lines, first, last = [], None, None
+
+    # Os blocos vão direto para um arquivo temporário: a memória usada é a de
+    # um bloco, não a da partição inteira.
+    with open(path + ".tmp", "wb") as f:
+        def close_block():
+            nonlocal offset, lines
+            data = _compress(codec, "".join(lines).encode())
+            f.write(data)
+            blocks.append({
+                "offset": offset, "length": len(data), "rows": len(lines),
+                "min_ts": _plain(first), "max_ts": _plain(last),
+            })
+            offset += len(data)
+            lines = []
+
+        for row in rows:
+            mapping = row._mapping
+            if not lines:
+                first = mapping["timestamp"]
+            last = mapping["timestamp"]
+            lines.append(json.dumps({key: _plain(value) for key, value in mapping.items()}, ensure_ascii=False) + "\n")
+            if len(lines) >= settings.LOG_ARCHIVE_BLOCK_ROWS:
+                close_block()
+        if lines:
+            close_block()
+        f.flush()
+        os.fsync(f.fileno())
+
+    index = None
+    if not blocks:
+        os.remove(path + ".tmp")
+    else:
+        index = {
+            "partition": name,
+            "segment": os.path.basename(path),
+            "codec": codec,
+            "rows": sum(block["rows"] for block in blocks),
+            "bytes": offset,
+            "min_ts": blocks[0]["min_ts"],
+            "max_ts": blocks[-1]["max_ts"],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "blocks": blocks,
+        }
+        expected = conn.execute(select(func.count()).select_from(table)).scalar()
+        if expected != index["rows"]:
+            os.remove(path + ".tmp")
+            raise RuntimeError(f"Arquivamento de {name}: {index['rows']} linhas lidas, {expected} esperadas.")
+        _publish(path + ".tmp", path)
+        # O índice é publicado por último: um segmento sem índice é ignorado na leitura.
+        with open(path + INDEX_SUFFIX + ".tmp", "w") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        _publish(path + INDEX_SUFFIX + ".tmp", path + INDEX_SUFFIX)
+    partitions.drop_partition(conn, name, keep_sequence=True)
+    return index
+
+
+def archive_partitions(engine, archive_dir: str, after_days: int, now: datetime | None = None) -> list[dict]:
+    """Arquiva, uma por transação, as partições cujo período terminou há mais de `after_days` dias."""
+    if partitions.mode() == partitions.MODE_NONE or after_days <= 0:
+        return []
+    cutoff = to_utc(now or datetime.now(timezone.utc)) - timedelta(days=after_days)
+    with engine.connect() as conn:
+        names = [name for name, _, end in partitions.list_partitions(conn) if end <= cutoff]
+    archived = []
+    for name in names:
+        with engine.begin() as conn:
+            index = archive_partition(conn, name, archive_dir)
+        if index is not None:
+            print(f"Arquivamento: {name} -> {index['segment']} ({index['rows']} logs, {index['bytes']} bytes)")
+            archived.append(index)
+    return archived
+
+
+# --- Leitura ---
+
+def list_segments(archive_dir: str) -> list[dict]:
+    """Índices dos segmentos publicados, em ordem cronológica."""
+    if not os.path.isdir(archive_dir):
+        return []
+    segments = []
+    for filename in os.listdir(archive_dir):
+        if not filename.endswith(INDEX_SUFFIX):
+            continue
+        path = os.path.join(archive_dir, filename)
+        index = _indexes.get(path)
+        if index is None:
+            with open(path) as f:
+                index = json.load(f)
+            index["path"] = path[: -len(INDEX_SUFFIX)]
+            _indexes[path] = index
+        segments.append(index)
+    return sorted(segments, key=lambda index: (index["min_ts"], index["segment"]))
+
+
+def _overlaps(entry: dict, start: datetime | None, end: datetime | None) -> bool:
+    """O intervalo [min_ts, max_ts] de um segmento ou bloco cruza [start, end)?"""
+    return (
+        (end is None or to_utc(datetime.fromisoformat(entry["min_ts"])) < end)
+        and (start is None or to_utc(datetime.fromisoformat(entry["max_ts"])) >= start)
+    )
+
+
+def _matches(filters: LogFilters, row: dict) -> bool:
+    ts = to_utc(row["timestamp"])
+    return (
+        (filters.start is None or ts >= to_utc(filters.start))
+        and (filters.end is None or ts < to_utc(filters.end))
+        and (filters.service_name is None or row.get("service_name") == filters.service_name)
+        and (filters.user_id is None or row.get("user_id") == filters.user_id)
+        and (filters.level is None or row.get("level") == filters.level)
+        and (filters.mac_address is None or row.get("mac_address") == filters.mac_address.lower())
+        and (filters.room_id is None or row.get("room_id") == filters.room_id)
+        and (filters.command is None or row.get("command") == filters.command)
+        and (filters.outcome is None or row.get("outcome") == filters.outcome)
+    )
+
+
+def iter_rows(archive_dir: str, filters: LogFilters):
+    """
+    Percorre os logs arquivados que satisfazem os filtros, em ordem
+    cronológica dentro de cada segmento. As linhas têm todas as colunas atuais
+    de 'logs' (colunas criadas depois do arquivamento vêm como None).
+    """
+    columns = list(models.Log.__table__.columns.keys())
+    start = to_utc(filters.start) if filters.start else None
+    end = to_utc(filters.end) if filters.end else None
+    for index in list_segments(archive_dir):
+        if not _overlaps(index, start, end):
+            continue
+        with open(index["path"], "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for block in index["blocks"]:
+                if not _overlaps(block, start, end):
+                    continue
+                data = _decompress(index["codec"], mapped[block["offset"]: block["offset"] + block["length"]])
+                for line in data.splitlines():
+                    raw = json.loads(line)
+                    raw["timestamp"] = datetime.fromisoformat(raw["timestamp"])
+                    if _matches(filters, raw):
+                        yield {column: raw.get(column) for column in columns}
+
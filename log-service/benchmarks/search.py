@@ -0,0 +1,112 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/search.py
+# DESCRIÇÃO: Mede a latência da busca textual (queries.search_logs) sobre uma
+# base sintética de milhões de logs, comparando a busca indexada por palavras
+# com a varredura por trecho (LIKE '%...%').
+#
+# Usa os módulos do serviço diretamente; aponte DATABASE_URL para uma base
+# descartável (rode a partir da pasta log-service):
+#   DATABASE_URL=sqlite:///./bench_search.db python benchmarks/search.py --rows 2000000
+# Rodadas seguintes podem pular a carga com --skip-load.
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import ingest  # noqa: E402
+import models  # noqa: E402
+import partitions  # noqa: E402
+import queries  # noqa: E402
+import text_index  # noqa: E402
+
+TEMPLATES = [
+    ("command-service", "INFO", "Comando '{command}' enviado com sucesso para {mac}"),
+    ("command-service", "WARNING", "Permissão negada para o usuário {user} no dispositivo {mac}"),
+    ("command-service", "ERROR", "Falha ao publicar no broker MQTT para {mac}: timeout"),
+    ("auth-service", "INFO", "Login realizado para o usuário {user}"),
+    ("persistence-service", "INFO", "Sala {room} atualizada pelo usuário {user}"),
+]
+
+
+def mac(n):
+    return ":".join(f"{(n >> shift) & 0xFF:02x}" for shift in (40, 32, 24, 16, 8, 0))
+
+
+def load(rows, days, devices, chunk=10000, seed=42):
+    rng = random.Random(seed)
+    end = datetime.now(timezone.utc)
+    span = days * 86400
+    start = time.perf_counter()
+    written = 0
+    while written < rows:
+        batch = []
+        for _ in range(min(chunk, rows - written)):
+            service, level, template = rng.choice(TEMPLATES)
+            user = rng.randint(1, 5000)
+            batch.append({
+                "timestamp": end - timedelta(seconds=rng.random() * span),
+                "service_name": service,
+                "user_id": user,
+                "level": level,
+                "message": template.format(
+                    command=rng.choice(["abrir", "fechar"]), mac=mac(0xAABB00000000 + rng.randrange(devices)),
+                    user=user, room=rng.randint(1, 300),
+                ),
+            })
+        with database.SessionLocal() as db:
+            ingest.bulk_insert_logs(db, batch)
+            db.commit()
+        written += len(batch)
+        print(f"\r{written}/{rows} logs gravados", end="", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"\nCarga: {rows / elapsed:.0f} logs/s")
+
+
+def measure(label, queries_to_run, days, substring, limit):
+    latencies, hits = [], 0
+    for text_query in queries_to_run:
+        filters = queries.LogFilters(start=datetime.now(timezone.utc) - timedelta(days=days))
+        start = time.perf_counter()
+        with database.SessionLocal() as db:
+            hits += len(queries.search_logs(db, text_query, filters, limit=limit, substring=substring))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000
+    print(f"{label}: {len(latencies)} buscas p50={pick(0.5):.1f}ms p99={pick(0.99):.1f}ms "
+          f"resultados/busca={hits / len(latencies):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca textual do Log Service")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=60, help="período coberto pelos logs sintéticos")
+    parser.add_argument("--devices", type=int, default=20000, help="quantidade de MACs distintos")
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--window", type=int, default=7, help="janela da busca, em dias")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--skip-load", action="store_true")
+    args = parser.parse_args()
+
+    partitions.setup(database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    partitions.ensure_partitions(database.engine)
+    with database.engine.connect() as conn:
+        text_index.setup(database.engine, [table.name for table in partitions.tables_for_range(conn)])
+    if not args.skip_load:
+        load(args.rows, args.days, args.devices)
+
+    rng = random.Random(7)
+    macs = [mac(0xAABB00000000 + rng.randrange(args.devices)) for _ in range(args.searches)]
+    measure("palavras (índice)", macs, args.window, substring=False, limit=args.limit)
+    measure("palavras (índice), janela total", macs, args.days, substring=False, limit=args.limit)
+    measure("trecho (LIKE)", macs[: max(1, args.searches // 5)], args.window, substring=True, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/stream_fanout.py
+# DESCRIÇÃO: Mede a distribuição do GET /logs/stream com muitos assinantes
+# simultâneos: abre N conexões SSE, publica lotes de logs e mede quantos eventos
+# cada cliente recebeu e a latência entre a gravação (timestamp do log) e a
+# entrega.
+#
+# Com o log-service rodando (ex.: uvicorn main:app --port 8003):
+#   python benchmarks/stream_fanout.py --subscribers 200 --batches 20 --batch-size 100
+# -----------------------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import httpx
+
+
+async def subscribe(client, url, expected, received, latencies, ready):
+    async with client.stream("GET", f"{url}/logs/stream", params={"service_name": "bench-stream"}) as response:
+        ready.release()
+        count = 0
+        async for line in response.aiter_lines():
+            if line.startswith("event: dropped"):
+                break
+            if not line.startswith("data: "):
+                continue
+            log = json.loads(line[6:])
+            latencies.append(time.time() - datetime.fromisoformat(log["timestamp"]).timestamp())
+            count += 1
+            if count >= expected:
+                break
+        received.append(count)
+
+
+async def run(url, subscribers, batches, batch_size, timeout):
+    expected = batches * batch_size
+    received, latencies = [], []
+    ready = asyncio.Semaphore(0)
+    limits = httpx.Limits(max_connections=subscribers + 10)
+
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(subscribe(client, url, expected, received, latencies, ready))
+            for _ in range(subscribers)
+        ]
+        for _ in range(subscribers):
+            await ready.acquire()
+
+        start = time.perf_counter()
+        for b in range(batches):
+            await client.post(f"{url}/logs/batch", json=[
+                {"service_name": "bench-stream", "level": "INFO", "message": f"lote {b} item {i}"}
+                for i in range(batch_size)
+            ])
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        elapsed = time.perf_counter() - start
+        for task in pending:
+            task.cancel()
+
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000 if latencies else 0
+    complete = sum(1 for count in received if count >= expected)
+    print(f"{subscribers} assinantes x {expected} eventos: {sum(received) / elapsed:.0f} entregas/s "
+          f"completos={complete} incompletos={subscribers - complete} "
+          f"p50={pick(0.5):.1f}ms p99={pick(0.99):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de fan-out do stream de logs")
+    parser.add_argument("--url", default="http://localhost:8003")
+    parser.add_argument("--subscribers", type=int, default=200)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.subscribers, args.batches, args.batch_size, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
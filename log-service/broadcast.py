@@ -0,0 +1,138 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: broadcast.py
+# DESCRIÇÃO: Distribuição em tempo real dos logs gravados para os clientes de
+# GET /logs/stream (Server-Sent Events). A ingestão entrega as linhas depois do
+# commit; o broadcaster guarda as últimas em um buffer circular (para retomar
+# com Last-Event-ID) e as copia para a fila de cada assinante que passa nos
+# filtros. Cada item da fila é o lote de eventos de um commit, e as filas são
+# limitadas: um cliente lento demais é desconectado em vez de segurar memória
+# ou atrasar os outros.
+# -----------------------------------------------------------------------------
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event
+
+DROPPED = None  # marcador colocado na fila de um assinante desconectado
+
+
+@dataclass(eq=False)
+class Subscriber:
+    queue: asyncio.Queue
+    service_name: str | None = None
+    level: str | None = None
+    user_id: int | None = None
+    mac_address: str | None = None
+    room_id: int | None = None
+    dropped: bool = False
+
+    def matches(self, log: dict) -> bool:
+        return (
+            (self.service_name is None or log.get("service_name") == self.service_name)
+            and (self.level is None or log.get("level") == self.level)
+            and (self.user_id is None or log.get("user_id") == self.user_id)
+            and (self.mac_address is None or log.get("mac_address") == self.mac_address)
+            and (self.room_id is None or log.get("room_id") == self.room_id)
+        )
+
+
+class LogBroadcaster:
+    def __init__(self, history=1000, queue_size=1000):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)  # pares (sequência, log)
+        self._seq = 0
+        self._subscribers = set()
+        self._loop = None
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0}
+
+    def bind(self, loop):
+        """Associa o broadcaster ao event loop da aplicação (chamado no startup)."""
+        self._loop = loop
+
+    def unbind(self):
+        self._loop = None
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber)
+
+    def publish(self, logs):
+        """Pode ser chamado de qualquer thread (ingestão, write-behind)."""
+        if self._loop is None or not logs:
+            return
+        events = [{key: _plain(value) for key, value in log.items()} for log in logs]
+        self._loop.call_soon_threadsafe(self._fanout, events)
+
+    # --- Executados no event loop ---
+
+    def subscribe(self, service_name=None, level=None, user_id=None, mac_address=None, room_id=None, last_event_id=None):
+        subscriber = Subscriber(
+            asyncio.Queue(maxsize=self.queue_size), service_name, level, user_id,
+            mac_address.lower() if mac_address else None, room_id,
+        )
+        if last_event_id is not None:
+            # Reenvia o que o cliente perdeu, se ainda estiver no buffer circular.
+            missed = [(seq, log) for seq, log in self._history if seq > last_event_id and subscriber.matches(log)]
+            if missed:
+                self._offer(subscriber, missed)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    def metrics(self):
+        data = dict(self.stats)
+        data["subscribers"] = len(self._subscribers)
+        data["last_event_id"] = self._seq
+        return data
+
+    def _fanout(self, events):
+        batch = []
+        for log in events:
+            self._seq += 1
+            batch.append((self._seq, log))
+        self._history.extend(batch)
+        self.stats["published"] += len(batch)
+        for subscriber in list(self._subscribers):
+            matching = [(seq, log) for seq, log in batch if subscriber.matches(log)]
+            if matching:
+                self._offer(subscriber, matching)
+
+    def _offer(self, subscriber, batch):
+        try:
+            subscriber.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            self._drop(subscriber)
+            return
+        self.stats["delivered"] += len(batch)
+
+    def _drop(self, subscriber):
+        """Desconecta um assinante: esvazia sua fila e deixa só o marcador de queda."""
+        subscriber.dropped = True
+        self._subscribers.discard(subscriber)
+        self.stats["dropped_subscribers"] += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(DROPPED)
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stage(db, rows):
+    """Guarda linhas na sessão para serem publicadas somente após o commit."""
+    db.info.setdefault("broadcast", []).extend(rows)
+
+
+def attach(session_factory, broadcaster: LogBroadcaster):
+    """Registra os eventos de sessão que publicam (ou descartam) as linhas guardadas."""
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        broadcaster.publish(session.info.pop("broadcast", None))
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("broadcast", None)
@@ -10,6 +10,37 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # O valor será lido do arquivo .env
     DATABASE_URL: str = "sqlite:///./log.db"
+    # Quantidade máxima de logs aceitos em uma única chamada de ingestão em lote.
+    LOG_BATCH_MAX_SIZE: int = 10000
+    # Write-behind: POST /log/ grava em transações agrupadas por uma thread.
+    LOG_WRITE_BEHIND: bool = False
+    LOG_WRITE_BEHIND_FLUSH_MS: int = 200
+    LOG_WRITE_BEHIND_MAX_ROWS: int = 1000
+    LOG_WRITE_BEHIND_MAX_PENDING: int = 50000
+    # "commit": responde após o commit do lote; "buffer": responde ao entrar no buffer.
+    LOG_DURABILITY: str = "commit"
+    # Particionamento por período: "month", "day" ou "none" (tabela única).
+    LOG_PARTITION_INTERVAL: str = "month"
+    # Quantos períodos futuros manter criados com antecedência.
+    LOG_PARTITION_PRECREATE: int = 2
+    # Partições cujo período terminou há mais que isso são removidas (0 = nunca).
+    LOG_RETENTION_DAYS: int = 365
+    # Agregados por minuto mais antigos que isso são removidos (os por hora ficam).
+    LOG_ROLLUP_MINUTE_RETENTION_DAYS: int = 30
+    # Stream ao vivo (SSE): eventos mantidos para retomada e fila por cliente.
+    LOG_STREAM_HISTORY: int = 1000
+    LOG_STREAM_QUEUE_SIZE: int = 1000
+    LOG_STREAM_HEARTBEAT_S: float = 15.0
+    # Camada fria: partições cujo período terminou há mais que isso são gravadas
+    # em segmentos comprimidos em LOG_ARCHIVE_DIR e saem do banco (0 = desligado).
+    LOG_ARCHIVE_AFTER_DAYS: int = 0
+    LOG_ARCHIVE_DIR: str = "./archive"
+    LOG_ARCHIVE_BLOCK_ROWS: int = 10000
+    LOG_ARCHIVE_ZSTD_LEVEL: int = 9
+    # Busca textual sem 'start' olha só os últimos N dias.
+    LOG_SEARCH_DEFAULT_DAYS: int = 7
+    # Intervalo do job de manutenção (criação de partições e retenção).
+    LOG_MAINTENANCE_INTERVAL_S: int = 3600
 
     class Config:
         env_file = ".env"
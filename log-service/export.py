@@ -0,0 +1,104 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: export.py
+# DESCRIÇÃO: Exportação de logs em NDJSON ou CSV com memória constante. As
+# linhas são lidas com cursor no servidor (stream_results/yield_per), partição
+# por partição (e, se pedido, dos segmentos arquivados), e convertidas em
+# blocos de texto que seguem direto para a resposta HTTP, opcionalmente
+# comprimidos em gzip durante o envio.
+# -----------------------------------------------------------------------------
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select
+
+import archive
+import partitions
+from database import settings
+from queries import LogFilters
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MEDIA_TYPES = {FORMAT_NDJSON: "application/x-ndjson", FORMAT_CSV: "text/csv"}
+
+# Tamanho aproximado de cada pedaço enviado ao cliente.
+CHUNK_BYTES = 64 * 1024
+
+
+def iter_rows(engine, filters: LogFilters, yield_per=1000):
+    """Percorre os logs em ordem cronológica sem carregar o resultado em memória."""
+    with engine.connect() as conn:
+        # tables_for_range devolve da partição mais recente para a mais antiga.
+        for table in reversed(partitions.tables_for_range(conn, filters.start, filters.end)):
+            query = (
+                select(table)
+                .where(*filters.conditions(table))
+                .order_by(table.c.timestamp, table.c.id)
+            )
+            result = conn.execution_options(stream_results=True, yield_per=yield_per).execute(query)
+            for row in result:
+                yield row._mapping
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _chunked(lines):
+    """Agrupa linhas pequenas em pedaços de ~CHUNK_BYTES."""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps({key: _plain(value) for key, value in row.items()}, ensure_ascii=False) + "\n"
+
+
+def _csv_lines(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    header_written = False
+    for row in rows:
+        if not header_written:
+            writer.writerow(row.keys())
+            header_written = True
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else _plain(value)
+            for value in row.values()
+        ])
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # wbits=31: cabeçalho/rodapé gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(engine, filters: LogFilters, fmt: str = FORMAT_NDJSON, gzip: bool = False, include_archive: bool = False):
+    """
+    Gerador de bytes com o conteúdo da exportação. Com `include_archive`, os
+    logs dos segmentos arquivados (os mais antigos) vêm antes dos do banco.
+    """
+    rows = iter_rows(engine, filters)
+    if include_archive:
+        rows = itertools.chain(archive.iter_rows(settings.LOG_ARCHIVE_DIR, filters), rows)
+    lines = _csv_lines(rows) if fmt == FORMAT_CSV else _ndjson_lines(rows)
+    chunks = _chunked(lines)
+    return _gzip(chunks) if gzip else chunks
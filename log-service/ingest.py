@@ -0,0 +1,112 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: ingest.py
+# DESCRIÇÃO: Caminho de escrita dos logs. Converte os payloads recebidos em
+# linhas da tabela e as grava em lote: COPY no PostgreSQL e INSERT com
+# executemany nos demais bancos, sempre na partição correta.
+# -----------------------------------------------------------------------------
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+import broadcast
+import partitions
+import rollups
+import schemas
+from partitions import to_utc
+
+# Colunas gravadas pela ingestão (o id é gerado pelo banco).
+COLUMNS = [
+    "timestamp", "service_name", "user_id", "level", "message",
+    "mac_address", "room_id", "command", "outcome", "latency_ms", "extras",
+]
+
+
+def to_row(log: schemas.LogCreate) -> dict:
+    """Converte um LogCreate no dicionário de colunas da tabela 'logs'."""
+    row = log.model_dump(include=set(COLUMNS))
+    row["timestamp"] = to_utc(log.timestamp) if log.timestamp else datetime.now(timezone.utc)
+    if row["mac_address"]:
+        # Um único formato de MAC para que as consultas por porta usem o índice.
+        row["mac_address"] = row["mac_address"].lower()
+    return row
+
+
+def bulk_insert_logs(db: Session, rows: list[dict]) -> int:
+    """
+    Grava as linhas na transação corrente da sessão, sem commit e sem reler
+    os registros. As linhas vão para os agregados e para o stream ao vivo
+    quando a transação for confirmada. Retorna a quantidade de linhas gravadas
+    (logs anteriores ao período de retenção são descartados).
+    """
+    if not rows:
+        return 0
+    conn = db.connection()
+    routed = partitions.route(conn, rows)
+    rows = [row for _, group in routed for row in group]
+    if not rows:
+        return 0
+    saved = []
+    for table, group in routed:
+        if conn.dialect.name == "postgresql":
+            ids = _copy_rows(db, table, group)
+        else:
+            stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            ids = conn.execute(stmt, group).scalars().all()
+        # O stream ao vivo recebe as linhas com o id gravado, como em insert_log.
+        saved.extend({"id": log_id, **row} for row, log_id in zip(group, ids))
+    rollups.stage(db, rows)
+    broadcast.stage(db, saved)
+    return len(rows)
+
+
+def insert_log(db: Session, row: dict):
+    """
+    Grava um único log e devolve a linha gravada (com id), sem uma segunda
+    consulta. Levanta ExpiredLogError se o log for anterior à retenção.
+    """
+    conn = db.connection()
+    routed = partitions.route(conn, [row])
+    if not routed:
+        raise partitions.ExpiredLogError("Log anterior ao período de retenção.")
+    [(table, _)] = routed
+    saved = conn.execute(insert(table).values(**row).returning(table)).one()
+    rollups.stage(db, [row])
+    broadcast.stage(db, [dict(saved._mapping)])
+    return saved
+
+
+def _copy_rows(db: Session, table, rows: list[dict]) -> list[int]:
+    """
+    Ingestão via COPY ... FROM STDIN (psycopg2), bem mais rápida que INSERTs.
+    COPY não devolve os ids: eles são reservados antes na sequência da tabela
+    e gravados junto com as linhas. Devolve os ids, na ordem das linhas.
+    """
+    ids = db.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+        {"table": table.name, "n": len(rows)},
+    ).scalars().all()
+    buffer = io.StringIO()
+    # QUOTE_NONNUMERIC diferencia None (campo vazio = NULL) de string vazia ("").
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row, log_id in zip(rows, ids):
+        writer.writerow([
+            log_id,
+            row["timestamp"].isoformat() if row.get("timestamp") else None,
+            *(row.get(column) for column in COLUMNS[1:-1]),
+            json.dumps(row["extras"]) if row.get("extras") is not None else None,
+        ])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} (id, {', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+    return ids
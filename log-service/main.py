@@ -1,4 +1,14 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 # MUDANÇA: Importações relativas alteradas para absolutas.
@@ -6,11 +16,65 @@ from sqlalchemy.orm import Session
 import models
 import schemas
 import database
+import ingest
+import queries
+import partitions
+import rollups
+import export
+import broadcast
+import text_index
+from maintenance import MaintenanceWorker
+from write_behind import WriteBehindBuffer, BufferFull, FlushError, DURABILITY_COMMIT
+
+# Define o particionamento antes do create_all (no PostgreSQL a tabela
+# 'logs' precisa ser criada já particionada).
+partitions.setup(database.engine)
 
 # Cria as tabelas no banco de dados se não existirem
 models.Base.metadata.create_all(bind=database.engine)
+partitions.ensure_partitions(database.engine)
+# create_all não altera tabelas que já existem: colunas e índices novos do
+# modelo são adicionados aqui (na tabela original e em cada partição).
+partitions.upgrade_schema(database.engine)
+rollups.upgrade_schema(database.engine)
+# Índices de texto para /logs/search (preenche os das tabelas que ainda não tinham).
+with database.engine.connect() as conn:
+    log_tables = [table.name for table in partitions.tables_for_range(conn)]
+text_index.setup(database.engine, log_tables)
+
+settings = database.settings
+maintenance = MaintenanceWorker(database.engine, settings.LOG_MAINTENANCE_INTERVAL_S)
+
+# Logs confirmados no banco são repassados aos clientes de /logs/stream.
+broadcaster = broadcast.LogBroadcaster(history=settings.LOG_STREAM_HISTORY, queue_size=settings.LOG_STREAM_QUEUE_SIZE)
+broadcast.attach(database.SessionLocal, broadcaster)
+# Os agregados são atualizados depois do commit, numa transação separada.
+rollups.attach(database.SessionLocal)
+
+# Buffer write-behind opcional para POST /log/ (desligado por padrão).
+write_behind = None
+if settings.LOG_WRITE_BEHIND:
+    write_behind = WriteBehindBuffer(
+        database.SessionLocal,
+        flush_interval_ms=settings.LOG_WRITE_BEHIND_FLUSH_MS,
+        max_rows=settings.LOG_WRITE_BEHIND_MAX_ROWS,
+        max_pending=settings.LOG_WRITE_BEHIND_MAX_PENDING,
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    broadcaster.bind(asyncio.get_running_loop())
+    maintenance.start()
+    if write_behind is not None:
+        write_behind.start()
+    yield
+    if write_behind is not None:
+        # Esvazia o buffer antes de encerrar.
+        write_behind.stop()
+    maintenance.stop()
+    broadcaster.unbind()
 
-app = FastAPI(title="Log Service")
+app = FastAPI(title="Log Service", lifespan=lifespan)
 
 # Dependência para obter a sessão do banco de dados
 def get_db():
@@ -20,23 +84,234 @@ def get_db():
     finally:
         db.close()
 
-@app.post("/log/", response_model=schemas.LogResponse, status_code=201)
-def create_log(log: schemas.LogCreate, db: Session = Depends(get_db)):
+def log_filters(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    service_name: str | None = None,
+    user_id: int | None = None,
+    level: str | None = None,
+    mac_address: str | None = None,
+    room_id: int | None = None,
+    command: str | None = None,
+    outcome: str | None = None,
+) -> queries.LogFilters:
+    """Filtros comuns às consultas de logs (query string), incluindo os campos estruturados."""
+    return queries.LogFilters(
+        start=start, end=end, service_name=service_name, user_id=user_id, level=level,
+        mac_address=mac_address, room_id=room_id, command=command, outcome=outcome,
+    )
+
+@app.post("/log/", response_model=schemas.LogResponse | schemas.LogAccepted, status_code=201)
+def create_log(log: schemas.LogCreate, response: Response, db: Session = Depends(get_db)):
     """
     Recebe um evento de log e o salva no banco de dados.
     """
-    db_log = models.Log(
-        service_name=log.service_name,
-        user_id=log.user_id,
-        level=log.level,
-        message=log.message
-    )
-    db.add(db_log)
+    if write_behind is not None:
+        durable = settings.LOG_DURABILITY == DURABILITY_COMMIT
+        try:
+            write_behind.submit(ingest.to_row(log), wait=durable)
+        except BufferFull:
+            raise HTTPException(status_code=503, detail="Buffer de logs cheio, tente novamente.")
+        except FlushError as e:
+            raise HTTPException(status_code=503, detail=f"Falha ao gravar o log: {e}")
+        if not durable:
+            response.status_code = 202
+        return {"status": "committed" if durable else "queued", "buffered": write_behind.depth()}
+
+    try:
+        db_log = ingest.insert_log(db, ingest.to_row(log))
+    except partitions.ExpiredLogError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     db.commit()
-    db.refresh(db_log)
     print(f"Log salvo: {db_log.service_name} - {db_log.message}")
     return db_log
 
+@app.post("/logs/batch", response_model=schemas.BatchResult, status_code=201)
+def create_logs_batch(logs: list[schemas.LogCreate], db: Session = Depends(get_db)):
+    """
+    Recebe uma lista de eventos de log e os grava em uma única transação.
+    Retorna apenas as contagens, sem reler os registros inseridos.
+    """
+    if len(logs) > settings.LOG_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Lote excede o limite de {settings.LOG_BATCH_MAX_SIZE} logs.")
+    inserted = ingest.bulk_insert_logs(db, [ingest.to_row(log) for log in logs])
+    db.commit()
+    return {"received": len(logs), "inserted": inserted}
+
+@app.post("/logs/batch/ndjson", response_model=schemas.BatchResult, status_code=201)
+async def create_logs_ndjson(request: Request, db: Session = Depends(get_db)):
+    """
+    Variante em streaming: um log JSON por linha (application/x-ndjson).
+    O corpo é lido em pedaços e gravado em blocos, tudo na mesma transação.
+    """
+    chunk_size = settings.LOG_BATCH_MAX_SIZE
+    rows, received, inserted, line_number = [], 0, 0, 0
+    pending = b""
+
+    def parse(line):
+        try:
+            return ingest.to_row(schemas.LogCreate.model_validate_json(line))
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            raise HTTPException(status_code=422, detail={"line": line_number, "errors": errors})
+
+    try:
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if not line.strip():
+                    continue
+                rows.append(parse(line))
+                received += 1
+                if len(rows) >= chunk_size:
+                    inserted += await run_in_threadpool(ingest.bulk_insert_logs, db, rows)
+                    rows = []
+        if pending.strip():
+            line_number += 1
+            rows.append(parse(pending))
+            received += 1
+        inserted += await run_in_threadpool(ingest.bulk_insert_logs, db, rows)
+        await run_in_threadpool(db.commit)
+    except Exception:
+        await run_in_threadpool(db.rollback)
+        raise
+    return {"received": received, "inserted": inserted}
+
+@app.get("/logs/", response_model=schemas.LogPage)
+def list_logs(
+    filters: queries.LogFilters = Depends(log_filters),
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    Consulta logs do mais recente para o mais antigo. Para a próxima página,
+    repita a chamada passando o `next_cursor` recebido.
+    """
+    try:
+        items, next_cursor = queries.list_logs(db, filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/logs/search", response_model=list[schemas.LogSearchHit])
+def search_logs(
+    q: str = Query(..., min_length=1, max_length=256),
+    filters: queries.LogFilters = Depends(log_filters),
+    match: Literal["words", "substring"] = "words",
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Busca logs pelo texto da mensagem (ex.: um MAC "aa:bb:cc:dd:ee:ff"), em
+    ordem de relevância. `match=words` usa o índice de texto; `substring` casa
+    trechos de palavras. Sem `start`, busca nos últimos LOG_SEARCH_DEFAULT_DAYS dias.
+    """
+    if filters.start is None:
+        filters.start = (filters.end or datetime.now(timezone.utc)) - timedelta(days=settings.LOG_SEARCH_DEFAULT_DAYS)
+    try:
+        return queries.search_logs(db, q, filters, limit=limit, substring=match == "substring")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/logs/rollups", response_model=list[schemas.RollupPoint])
+def read_rollups(
+    resolution: Literal["minute", "hour"] = "minute",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    service_name: str | None = None,
+    level: str | None = None,
+    room_id: int | None = None,
+    outcome: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Série temporal de contagens de logs por serviço, nível, sala e resultado,
+    lida dos agregados pré-calculados (ex.: acessos negados de uma sala com
+    `room_id=3&outcome=denied`). Sem `start`, retorna a última hora (minuto)
+    ou o último dia (hora).
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - (timedelta(hours=1) if resolution == rollups.MINUTE else timedelta(days=1))
+    return rollups.series(
+        db.connection(), resolution, start, end,
+        service_name=service_name, level=level, room_id=room_id, outcome=outcome,
+    )
+
+@app.get("/logs/export")
+def export_logs(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    include_archive: bool = False,
+    filters: queries.LogFilters = Depends(log_filters),
+):
+    """
+    Exporta os logs filtrados em ordem cronológica, em streaming. O uso de
+    memória não depende do tamanho do resultado. `include_archive` inclui os
+    logs já movidos para a camada fria (segmentos fora do intervalo são pulados).
+    """
+    filename = f"logs.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export.stream_export(database.engine, filters, fmt=format, gzip=gzip, include_archive=include_archive),
+        media_type="application/gzip" if gzip else export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/logs/stream")
+async def stream_logs(
+    request: Request,
+    service_name: str | None = None,
+    level: str | None = None,
+    user_id: int | None = None,
+    mac_address: str | None = None,
+    room_id: int | None = None,
+    last_event_id: int | None = Header(None),
+):
+    """
+    Acompanha os logs em tempo real (Server-Sent Events). Ao reconectar, o
+    navegador envia Last-Event-ID e recebe o que perdeu, se ainda estiver no
+    histórico em memória.
+    """
+    subscriber = broadcaster.subscribe(
+        service_name=service_name, level=level, user_id=user_id,
+        mac_address=mac_address, room_id=room_id, last_event_id=last_event_id,
+    )
+
+    async def events():
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), settings.LOG_STREAM_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if item is broadcast.DROPPED:
+                    yield "event: dropped\ndata: cliente lento demais, reconecte\n\n"
+                    break
+                yield "".join(
+                    f"id: {seq}\ndata: {json.dumps(log, ensure_ascii=False)}\n\n" for seq, log in item
+                )
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/")
 def read_root():
-    return {"service": "Log Service", "status": "online"}
\ No newline at end of file
+    return {"service": "Log Service", "status": "online"}
+
+@app.get("/health")
+def read_health():
+    write_behind_status = {"enabled": write_behind is not None}
+    if write_behind is not None:
+        write_behind_status["durability"] = settings.LOG_DURABILITY
+        write_behind_status.update(write_behind.metrics())
+    return {"status": "online", "write_behind": write_behind_status, "stream": broadcaster.metrics()}
\ No newline at end of file
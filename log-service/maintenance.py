@@ -0,0 +1,104 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: maintenance.py
+# DESCRIÇÃO: Tarefas periódicas do Log Service (criação antecipada de partições,
+# arquivamento, retenção e limpeza dos agregados). Roda em uma thread dentro da
+# aplicação e também pode ser chamado pela linha de comando:
+#   python maintenance.py run          # executa todas as tarefas uma vez
+#   python maintenance.py partitions   # lista as partições existentes
+#   python maintenance.py archive [--older-than DIAS]  # arquiva partições antigas
+#   python maintenance.py segments     # lista os segmentos arquivados
+#   python maintenance.py backfill-rollups --start 2026-01-01 [--end ...]
+# -----------------------------------------------------------------------------
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import archive
+import database
+import partitions
+import rollups
+
+settings = database.settings
+
+
+def run_maintenance(engine):
+    """Executa um ciclo de manutenção e devolve um resumo do que foi feito."""
+    created = partitions.ensure_partitions(engine)
+    # O arquivamento roda antes da retenção, que só remove o que sobrou no banco.
+    archived = archive.archive_partitions(engine, settings.LOG_ARCHIVE_DIR, settings.LOG_ARCHIVE_AFTER_DAYS)
+    dropped = partitions.drop_expired(engine, settings.LOG_RETENTION_DAYS)
+    if dropped:
+        print(f"Retenção: partições removidas {dropped}")
+    pruned = rollups.prune(engine, settings.LOG_ROLLUP_MINUTE_RETENTION_DAYS)
+    return {
+        "partitions": created,
+        "archived": [index["partition"] for index in archived],
+        "dropped": dropped,
+        "pruned_minute_rollups": pruned,
+    }
+
+
+class MaintenanceWorker:
+    """Thread que executa `run_maintenance` a cada LOG_MAINTENANCE_INTERVAL_S segundos."""
+
+    def __init__(self, engine, interval):
+        self.engine = engine
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                run_maintenance(self.engine)
+            except Exception as e:
+                print(f"ERRO: Falha na manutenção do Log Service: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção do Log Service")
+    parser.add_argument("command", choices=["run", "partitions", "archive", "segments", "backfill-rollups"])
+    parser.add_argument("--older-than", type=int, help="arquiva partições encerradas há mais de N dias")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="início (ISO 8601) para o backfill")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="fim (ISO 8601) para o backfill; padrão: agora")
+    args = parser.parse_args()
+
+    partitions.setup(database.engine)
+    if args.command == "run":
+        print(run_maintenance(database.engine))
+    elif args.command == "partitions":
+        with database.engine.connect() as conn:
+            for name, start, end in partitions.list_partitions(conn):
+                print(f"{name}\t{start:%Y-%m-%d}\t{end:%Y-%m-%d}")
+    elif args.command == "archive":
+        days = args.older_than if args.older_than is not None else settings.LOG_ARCHIVE_AFTER_DAYS
+        if days <= 0:
+            parser.error("archive exige --older-than ou LOG_ARCHIVE_AFTER_DAYS > 0")
+        archived = archive.archive_partitions(database.engine, settings.LOG_ARCHIVE_DIR, days)
+        print(f"{len(archived)} partições arquivadas em {settings.LOG_ARCHIVE_DIR}.")
+    elif args.command == "segments":
+        for index in archive.list_segments(settings.LOG_ARCHIVE_DIR):
+            print(f"{index['segment']}\t{index['min_ts']}\t{index['max_ts']}\t{index['rows']}\t{index['bytes']}")
+    elif args.command == "backfill-rollups":
+        if args.start is None:
+            parser.error("backfill-rollups exige --start")
+        rollups.upgrade_schema(database.engine)
+        database.Base.metadata.create_all(bind=database.engine, tables=[
+            model.__table__ for model in rollups.MODELS.values()
+        ])
+        counted = rollups.backfill(database.engine, args.start, args.end or datetime.now(timezone.utc))
+        print(f"Agregados recalculados a partir de {counted} logs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 # -----------------------------------------------------------------------------
 # ARQUIVO: log-service/models.py
 # -----------------------------------------------------------------------------
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
 # MUDANÇA: Importação relativa alterada para absoluta.
@@ -15,4 +16,45 @@ class Log(Base):
     service_name = Column(String(50), index=True) # Ex: 'auth-service', 'command-service'
     user_id = Column(Integer, nullable=True)
     level = Column(String(20), default="INFO") # Ex: INFO, ERROR, WARNING
-    message = Column(String(512))
\ No newline at end of file
+    message = Column(String(512))
+
+    # Campos estruturados (opcionais): permitem consultar por porta, sala ou
+    # resultado sem interpretar o texto de 'message'.
+    mac_address = Column(String(17), nullable=True) # Ex: 'aa:bb:cc:dd:ee:ff' (minúsculo)
+    room_id = Column(Integer, nullable=True)
+    command = Column(String(50), nullable=True) # Ex: 'abrir', 'fechar'
+    outcome = Column(String(20), nullable=True) # Ex: 'success', 'denied', 'error'
+    latency_ms = Column(Float, nullable=True)
+    extras = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True) # demais atributos do evento
+
+    # Índices compostos para a API de consulta: cada filtro seguido de
+    # (timestamp, id), que é a ordem da paginação por cursor.
+    __table_args__ = (
+        Index("ix_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_logs_service_timestamp_id", "service_name", "timestamp", "id"),
+        Index("ix_logs_user_timestamp_id", "user_id", "timestamp", "id"),
+        Index("ix_logs_level_timestamp_id", "level", "timestamp", "id"),
+        Index("ix_logs_mac_timestamp_id", "mac_address", "timestamp", "id"),
+        Index("ix_logs_room_timestamp_id", "room_id", "timestamp", "id"),
+    )
+
+class RollupColumns:
+    """Colunas comuns às tabelas de agregados (contagem de logs por intervalo)."""
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), nullable=False) # início do minuto/hora
+    service_name = Column(String(50), nullable=False)
+    level = Column(String(20), nullable=False)
+    # Dimensões dos logs estruturados (portas). Fazem parte da chave única,
+    # por isso não são nulas: 0 = log sem sala, "" = log sem resultado.
+    room_id = Column(Integer, nullable=False, default=0)
+    outcome = Column(String(20), nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+class LogRollupMinute(RollupColumns, Base):
+    __tablename__ = "log_rollups_minute"
+    # A chave única atende tanto o upsert incremental quanto as consultas por intervalo.
+    __table_args__ = (UniqueConstraint("bucket", "service_name", "level", "room_id", "outcome", name="uq_log_rollups_minute_key"),)
+
+class LogRollupHour(RollupColumns, Base):
+    __tablename__ = "log_rollups_hour"
+    __table_args__ = (UniqueConstraint("bucket", "service_name", "level", "room_id", "outcome", name="uq_log_rollups_hour_key"),)
@@ -0,0 +1,348 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: partitions.py
+# DESCRIÇÃO: Particionamento da tabela de logs por período (dia ou mês).
+#
+# - PostgreSQL: particionamento nativo (PARTITION BY RANGE (timestamp)). A
+#   tabela 'logs' é a "mãe" e cada período é uma partição 'logs_pAAAAMM[DD]';
+#   o planejador descarta sozinho as partições fora do intervalo consultado.
+# - SQLite: uma tabela comum por período, com o mesmo esquema e índices (e o
+#   seu índice de texto FTS5, ver text_index.py). Este módulo roteia as
+#   escritas para a tabela certa e diz às consultas quais tabelas cobrem um
+#   intervalo de tempo.
+#
+# Em ambos os casos a retenção é um DROP TABLE por partição expirada, em vez de
+# um DELETE ... WHERE timestamp < X linha a linha.
+# -----------------------------------------------------------------------------
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+import models
+import text_index
+from database import settings
+
+MODE_NATIVE = "native"  # PostgreSQL, particionamento declarativo
+MODE_TABLES = "tables"  # SQLite, uma tabela por período
+MODE_NONE = "none"  # tabela única (particionamento desligado)
+
+INTERVAL_DAY = "day"
+INTERVAL_MONTH = "month"
+
+PARENT = models.Log.__tablename__
+_NAME_RE = re.compile(rf"^{PARENT}_p(\d{{6}}|\d{{8}})$")
+
+_mode = MODE_NONE
+_known = set()  # partições que este processo já sabe que existem
+_tables = {}  # cache de objetos Table das partições (modo "tables")
+_metadata = MetaData()
+
+
+class ExpiredLogError(ValueError):
+    """O log pertence a um período que a retenção já removeu."""
+
+
+def to_utc(value: datetime) -> datetime:
+    """Normaliza datas para UTC (datas sem fuso são consideradas UTC)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def mode():
+    return _mode
+
+
+# --- Períodos ---
+
+def period_start(ts: datetime) -> datetime:
+    ts = to_utc(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+    if settings.LOG_PARTITION_INTERVAL == INTERVAL_DAY:
+        return ts
+    return ts.replace(day=1)
+
+
+def period_end(start: datetime, name: str | None = None) -> datetime:
+    """Início do período seguinte. O nome da partição, se dado, define a granularidade."""
+    daily = len(name) - len(PARENT) - 2 == 8 if name else settings.LOG_PARTITION_INTERVAL == INTERVAL_DAY
+    if daily:
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: datetime) -> str:
+    if settings.LOG_PARTITION_INTERVAL == INTERVAL_DAY:
+        return f"{PARENT}_p{start:%Y%m%d}"
+    return f"{PARENT}_p{start:%Y%m}"
+
+
+def parse_partition_name(name: str):
+    """Devolve (início, fim) do período de uma partição, ou None se o nome não for de partição."""
+    match = _NAME_RE.match(name)
+    if not match:
+        return None
+    digits = match.group(1)
+    fmt = "%Y%m%d" if len(digits) == 8 else "%Y%m"
+    start = datetime.strptime(digits, fmt).replace(tzinfo=timezone.utc)
+    return start, period_end(start, name)
+
+
+# --- Configuração ---
+
+def setup(engine):
+    """
+    Define o modo de particionamento. Deve rodar antes do create_all: no
+    PostgreSQL a tabela 'logs' precisa nascer particionada.
+    """
+    global _mode
+    _known.clear()
+    if settings.LOG_PARTITION_INTERVAL not in (INTERVAL_DAY, INTERVAL_MONTH):
+        _mode = MODE_NONE
+        return _mode
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            relkind = conn.execute(
+                text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"),
+                {"name": PARENT},
+            ).scalar()
+            if relkind == "r":
+                print(f"AVISO: a tabela '{PARENT}' já existe sem particionamento; particionamento desativado.")
+                _mode = MODE_NONE
+                return _mode
+            if relkind is None:
+                columns = ", ".join(
+                    str(CreateColumn(column).compile(dialect=engine.dialect))
+                    for column in models.Log.__table__.columns
+                )
+                conn.execute(text(
+                    f"CREATE TABLE {PARENT} ({columns}, PRIMARY KEY (id, timestamp)) "
+                    f"PARTITION BY RANGE (timestamp)"
+                ))
+        _mode = MODE_NATIVE
+    elif engine.dialect.name == "sqlite":
+        _mode = MODE_TABLES
+    else:
+        _mode = MODE_NONE
+    return _mode
+
+
+def partition_table(name):
+    """
+    Objeto Table de uma partição: cópia do esquema de 'logs' com índices
+    renomeados (no SQLite, é a definição usada para criar a tabela).
+    """
+    table = _tables.get(name)
+    if table is None:
+        table = models.Log.__table__.to_metadata(_metadata, name=name)
+        table.dialect_options["sqlite"]["autoincrement"] = True
+        for index in table.indexes:
+            index.name = index.name.replace(f"ix_{PARENT}_", f"ix_{name}_", 1)
+        _tables[name] = table
+    return table
+
+
+def _id_seed(start: datetime) -> int:
+    """
+    Primeiro id de uma partição SQLite. Cada tabela tem sua própria sequência,
+    então os ids partem de um bloco derivado do período para não se repetirem
+    entre partições (e crescem junto com o tempo).
+    """
+    if settings.LOG_PARTITION_INTERVAL == INTERVAL_DAY:
+        ordinal = start.date().toordinal()
+    else:
+        ordinal = start.year * 12 + start.month - 1
+    return ordinal << 32
+
+
+def create_partition(conn, start: datetime, remember: bool = True) -> str:
+    """
+    Cria (se necessário) a partição do período que começa em `start`. Com
+    `remember=False` a partição não entra no cache do processo: a transação
+    que a criou ainda pode sofrer rollback.
+    """
+    name = partition_name(start)
+    if name in _known:
+        return name
+    if _mode == MODE_NATIVE:
+        end = period_end(start)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+    elif _mode == MODE_TABLES:
+        partition_table(name).create(conn, checkfirst=True)
+        conn.execute(
+            text("INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                 "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"),
+            {"name": name, "seq": _id_seed(start)},
+        )
+        text_index.create_for_table(conn, name)
+    if remember:
+        _known.add(name)
+    return name
+
+
+def ensure_partitions(engine, now: datetime | None = None) -> list[str]:
+    """Garante a partição do período atual e as LOG_PARTITION_PRECREATE seguintes."""
+    if _mode == MODE_NONE:
+        return []
+    start = period_start(now or datetime.now(timezone.utc))
+    names = []
+    with engine.begin() as conn:
+        _known.update(name for name, _, _ in list_partitions(conn))
+        for _ in range(settings.LOG_PARTITION_PRECREATE + 1):
+            names.append(create_partition(conn, start))
+            start = period_end(start)
+    return names
+
+
+def list_partitions(conn) -> list[tuple[str, datetime, datetime]]:
+    """Partições existentes como (nome, início, fim), da mais antiga para a mais recente."""
+    if _mode == MODE_NATIVE:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {"parent": PARENT}).scalars()
+    elif _mode == MODE_TABLES:
+        names = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :pattern"
+        ), {"pattern": f"{PARENT}_p%"}).scalars()
+    else:
+        return []
+    result = []
+    for name in names:
+        bounds = parse_partition_name(name)
+        if bounds:
+            result.append((name, *bounds))
+    return sorted(result, key=lambda partition: partition[1])
+
+
+def upgrade_schema(engine) -> list[str]:
+    """
+    Adiciona às tabelas de logs já existentes as colunas e os índices que o
+    modelo ganhou depois que elas foram criadas (create_all e o checkfirst das
+    partições não alteram tabelas existentes). Devolve as colunas adicionadas.
+    """
+    added = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in tables_for_range(conn):
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    if added:
+        print(f"Esquema de logs atualizado: {len(added)} colunas adicionadas.")
+    return added
+
+
+# --- Roteamento de escrita e leitura ---
+
+def retention_cutoff(now: datetime | None = None) -> datetime | None:
+    """Limite da retenção: partições cujo período termina até ele são removidas."""
+    if _mode == MODE_NONE or settings.LOG_RETENTION_DAYS <= 0:
+        return None
+    return to_utc(now or datetime.now(timezone.utc)) - timedelta(days=settings.LOG_RETENTION_DAYS)
+
+
+def route(conn, rows):
+    """
+    Agrupa as linhas pela tabela onde devem ser gravadas, criando sob demanda
+    as partições que ainda não existem. Devolve pares (Table, linhas).
+
+    Linhas de períodos já expirados são descartadas: gravá-las recriaria uma
+    partição que a retenção removeu (e no PostgreSQL nem haveria partição
+    para recebê-las).
+    """
+    if _mode == MODE_NONE:
+        return [(models.Log.__table__, rows)]
+
+    cutoff = retention_cutoff()
+    groups = defaultdict(list)
+    expired = 0
+    for row in rows:
+        start = period_start(row["timestamp"])
+        if cutoff is not None and period_end(start) <= cutoff:
+            expired += 1
+            continue
+        groups[start].append(row)
+    if expired:
+        print(f"AVISO: {expired} logs anteriores ao período de retenção descartados.")
+    if not groups:
+        return []
+    if _mode == MODE_NATIVE:
+        # O PostgreSQL roteia sozinho; só garantimos que as partições existem.
+        for start in groups:
+            create_partition(conn, start, remember=False)
+        return [(models.Log.__table__, [row for group in groups.values() for row in group])]
+    return [
+        (partition_table(create_partition(conn, start, remember=False)), group)
+        for start, group in groups.items()
+    ]
+
+
+def tables_for_range(conn, start: datetime | None = None, end: datetime | None = None):
+    """
+    Tabelas a consultar para o intervalo [start, end), da mais recente para a
+    mais antiga. No PostgreSQL é sempre a tabela mãe (a poda é do planejador).
+    """
+    if _mode != MODE_TABLES:
+        return [models.Log.__table__]
+    start = to_utc(start) if start else None
+    end = to_utc(end) if end else None
+    tables = [
+        partition_table(name)
+        for name, p_start, p_end in reversed(list_partitions(conn))
+        if (end is None or p_start < end) and (start is None or p_end > start)
+    ]
+    # A tabela original guarda os logs anteriores ao particionamento (os mais antigos).
+    tables.append(models.Log.__table__)
+    return tables
+
+
+# --- Retenção ---
+
+def drop_expired(engine, retention_days: int, now: datetime | None = None) -> list[str]:
+    """Remove inteiras as partições cujo período terminou antes do limite de retenção."""
+    if _mode == MODE_NONE or retention_days <= 0:
+        return []
+    cutoff = to_utc(now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    dropped = []
+    with engine.begin() as conn:
+        for name, _, end in list_partitions(conn):
+            if end > cutoff:
+                break
+            drop_partition(conn, name)
+            dropped.append(name)
+    return dropped
+
+
+def drop_partition(conn, name: str, keep_sequence: bool = False):
+    """
+    Remove uma partição. Com `keep_sequence`, o SQLite guarda o último id da
+    tabela: se o período voltar a receber logs, a nova partição continua a
+    numeração em vez de repetir ids (usado pelo arquivamento).
+    """
+    seq = None
+    if _mode == MODE_TABLES and keep_sequence:
+        seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": name}).scalar()
+    conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    if _mode == MODE_TABLES:
+        text_index.drop_for_table(conn, name)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": name})
+        if seq is not None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": name, "seq": seq})
+    # O cache só é limpo aqui; se a transação sofrer rollback, create_partition
+    # recria a tabela com checkfirst.
+    _known.discard(name)
+    table = _tables.pop(name, None)
+    if table is not None:
+        _metadata.remove(table)
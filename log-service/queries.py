@@ -0,0 +1,122 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: queries.py
+# DESCRIÇÃO: Consultas de leitura sobre a tabela de logs. A paginação é por
+# cursor (keyset) em (timestamp, id), do mais recente para o mais antigo, o que
+# mantém cada página como uma busca no índice, por mais fundo que se navegue.
+# A busca textual usa os índices de text_index.py.
+# -----------------------------------------------------------------------------
+import base64
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import Session
+
+import partitions
+import text_index
+from partitions import to_utc
+
+
+@dataclass
+class LogFilters:
+    start: datetime | None = None
+    end: datetime | None = None
+    service_name: str | None = None
+    user_id: int | None = None
+    level: str | None = None
+    mac_address: str | None = None
+    room_id: int | None = None
+    command: str | None = None
+    outcome: str | None = None
+
+    def conditions(self, table):
+        conditions = []
+        if self.start is not None:
+            conditions.append(table.c.timestamp >= to_utc(self.start))
+        if self.end is not None:
+            conditions.append(table.c.timestamp < to_utc(self.end))
+        if self.service_name is not None:
+            conditions.append(table.c.service_name == self.service_name)
+        if self.user_id is not None:
+            conditions.append(table.c.user_id == self.user_id)
+        if self.level is not None:
+            conditions.append(table.c.level == self.level)
+        if self.mac_address is not None:
+            conditions.append(table.c.mac_address == self.mac_address.lower())
+        if self.room_id is not None:
+            conditions.append(table.c.room_id == self.room_id)
+        if self.command is not None:
+            conditions.append(table.c.command == self.command)
+        if self.outcome is not None:
+            conditions.append(table.c.outcome == self.outcome)
+        return conditions
+
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decodifica um cursor opaco. Levanta ValueError se ele for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, log_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return to_utc(datetime.fromisoformat(timestamp)), int(log_id)
+    except Exception as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def list_logs(db: Session, filters: LogFilters, cursor: str | None = None, limit: int = 100):
+    """
+    Retorna até `limit` logs que satisfazem os filtros e o cursor da próxima
+    página (None quando não há mais resultados).
+
+    As partições são percorridas da mais recente para a mais antiga; como os
+    períodos não se sobrepõem, basta concatenar os resultados de cada uma.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    upper = filters.end
+    if after and (upper is None or after[0] < to_utc(upper)):
+        # Partições posteriores ao cursor não têm nada a acrescentar.
+        upper = after[0] + timedelta(microseconds=1)
+
+    rows = []
+    for table in partitions.tables_for_range(db.connection(), filters.start, upper):
+        query = select(table).where(*filters.conditions(table))
+        if after:
+            query = query.where(tuple_(table.c.timestamp, table.c.id) < tuple_(*after))
+        query = query.order_by(table.c.timestamp.desc(), table.c.id.desc()).limit(limit + 1 - len(rows))
+        rows.extend(db.execute(query).all())
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
+
+
+def search_logs(db: Session, text_query: str, filters: LogFilters, limit: int = 50, substring: bool = False):
+    """
+    Logs cuja mensagem contém todos os termos de `text_query`, do mais para o
+    menos relevante (empates pelo mais recente). Cada partição do intervalo
+    devolve seus `limit` melhores e os resultados são combinados; no SQLite o
+    bm25 é calculado por partição, então a ordem entre partições é aproximada.
+    """
+    words = text_index.terms(text_query)
+    if not words:
+        raise ValueError("A busca precisa de ao menos um termo com letras ou números.")
+    conn = db.connection()
+    rows = []
+    for table in partitions.tables_for_range(conn, filters.start, filters.end):
+        query = (
+            text_index.search_select(conn, table, words, substring=substring)
+            .where(*filters.conditions(table))
+            .order_by(text("score DESC"), table.c.timestamp.desc())
+            .limit(limit)
+        )
+        rows.extend(db.execute(query).all())
+    rows.sort(key=lambda row: (row.score, row.timestamp), reverse=True)
+    return rows[:limit]
@@ -0,0 +1,226 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: rollups.py
+# DESCRIÇÃO: Agregados pré-calculados para os dashboards: contagem de logs por
+# minuto e por hora, por serviço, nível, sala e resultado (ex.: comandos de
+# porta, erros e acessos negados por sala). São mantidos de forma incremental:
+# a ingestão soma as contagens de toda a transação e, depois do commit, as
+# grava numa transação curta e separada (upsert somando às linhas existentes),
+# para que as linhas "quentes" do minuto atual não fiquem travadas durante a
+# ingestão. Podem ser reconstruídos a partir dos logs brutos (no banco e nos
+# segmentos arquivados) com `python maintenance.py backfill-rollups`.
+# -----------------------------------------------------------------------------
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+import archive
+import models
+import partitions
+from database import settings
+from partitions import to_utc
+from queries import LogFilters
+
+MINUTE = "minute"
+HOUR = "hour"
+MODELS = {MINUTE: models.LogRollupMinute, HOUR: models.LogRollupHour}
+KEY = ("bucket", "service_name", "level", "room_id", "outcome")
+
+# Valores gravados quando o log não tem sala ou resultado (a chave não aceita NULL).
+NO_ROOM = 0
+NO_OUTCOME = ""
+
+
+def truncate(ts: datetime, resolution: str) -> datetime:
+    ts = to_utc(ts).replace(second=0, microsecond=0)
+    return ts.replace(minute=0) if resolution == HOUR else ts
+
+
+def _insert(conn, table):
+    dialect = postgresql if conn.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
+
+
+def _upsert(conn, resolution, counts: Counter):
+    """Soma as contagens às linhas existentes (INSERT ... ON CONFLICT DO UPDATE)."""
+    if not counts:
+        return
+    table = MODELS[resolution].__table__
+    stmt = _insert(conn, table)
+    stmt = stmt.on_conflict_do_update(index_elements=list(KEY), set_={"count": table.c.count + stmt.excluded.count})
+    # Ordem fixa das chaves para que transações concorrentes travem as linhas na mesma ordem.
+    conn.execute(stmt, [{**dict(zip(KEY, key)), "count": count} for key, count in sorted(counts.items())])
+
+
+def _key(minute, service, level, room_id, outcome):
+    """Chave de agregado de minuto para um log (ou grupo de logs)."""
+    return (minute, service, level or "INFO", room_id or NO_ROOM, outcome or NO_OUTCOME)
+
+
+def _hours(minutes: Counter) -> Counter:
+    hours = Counter()
+    for (bucket, *dimensions), count in minutes.items():
+        hours[(truncate(bucket, HOUR), *dimensions)] += count
+    return hours
+
+
+def _count(minutes: Counter, rows):
+    for row in rows:
+        minutes[_key(truncate(row["timestamp"], MINUTE), row["service_name"], row.get("level"),
+                     row.get("room_id"), row.get("outcome"))] += 1
+
+
+def apply(conn, minutes: Counter):
+    """Soma as contagens por minuto (e as por hora derivadas delas) aos agregados."""
+    _upsert(conn, MINUTE, minutes)
+    _upsert(conn, HOUR, _hours(minutes))
+
+
+def stage(db, rows):
+    """Soma as linhas às contagens da sessão, gravadas somente após o commit."""
+    _count(db.info.setdefault("rollups", Counter()), rows)
+
+
+def attach(session_factory):
+    """Registra os eventos de sessão que gravam (ou descartam) as contagens guardadas."""
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        minutes = session.info.pop("rollups", None)
+        if not minutes:
+            return
+        try:
+            with session.get_bind().begin() as conn:
+                apply(conn, minutes)
+        except Exception as e:
+            # Os logs já foram confirmados; os agregados podem ser refeitos com backfill-rollups.
+            print(f"ERRO: Falha ao atualizar agregados de {sum(minutes.values())} logs: {e}")
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("rollups", None)
+
+
+def series(conn, resolution, start, end, service_name=None, level=None, room_id=None, outcome=None):
+    """Série temporal de contagens em [start, end), em ordem cronológica."""
+    table = MODELS[resolution].__table__
+    query = select(*(table.c[column] for column in KEY), table.c.count).where(
+        table.c.bucket >= truncate(start, resolution),
+        table.c.bucket < to_utc(end),
+    )
+    for column, value in (("service_name", service_name), ("level", level),
+                          ("room_id", room_id), ("outcome", outcome)):
+        if value is not None:
+            query = query.where(table.c[column] == value)
+    return [
+        {
+            **row._mapping,
+            "room_id": row.room_id if row.room_id != NO_ROOM else None,
+            "outcome": row.outcome if row.outcome != NO_OUTCOME else None,
+        }
+        for row in conn.execute(query.order_by(*(table.c[column] for column in KEY)))
+    ]
+
+
+def _minute_expression(conn, column):
+    if conn.dialect.name == "postgresql":
+        return func.date_trunc("minute", column)
+    return func.strftime("%Y-%m-%d %H:%M:00", column)
+
+
+def available_since() -> datetime | None:
+    """
+    Início dos logs que ainda podem ser relidos (no banco ou nos segmentos
+    arquivados), ou None se a retenção está desligada. O que a retenção removeu
+    sem arquivar só existe nos agregados, que não podem ser recalculados.
+    """
+    cutoff = partitions.retention_cutoff()
+    if cutoff is None:
+        return None
+    # A partição que contém o limite ainda não foi removida.
+    since = partitions.period_start(cutoff)
+    segments = archive.list_segments(settings.LOG_ARCHIVE_DIR)
+    if segments:
+        since = min(since, truncate(datetime.fromisoformat(segments[0]["min_ts"]), HOUR))
+    return since
+
+
+def backfill(engine, start: datetime, end: datetime) -> int:
+    """
+    Recalcula os agregados de [start, end) a partir dos logs brutos, no banco e
+    nos segmentos arquivados. O intervalo é alinhado em horas completas e não
+    volta antes de `available_since()`: agregados de logs que já não existem
+    são mantidos. Use-o sobre períodos já fechados, já que os agregados do
+    intervalo são apagados e regravados na mesma transação.
+    """
+    start = truncate(start, HOUR)
+    since = available_since()
+    if since is not None and start < since:
+        start = since
+    end = truncate(end, HOUR) + (timedelta(hours=1) if truncate(end, HOUR) < to_utc(end) else timedelta())
+    if start >= end:
+        return 0
+    minutes = Counter()
+    _count(minutes, archive.iter_rows(settings.LOG_ARCHIVE_DIR, LogFilters(start=start, end=end)))
+    with engine.begin() as conn:
+        for table in partitions.tables_for_range(conn, start, end):
+            bucket = _minute_expression(conn, table.c.timestamp)
+            dimensions = (table.c.service_name, table.c.level, table.c.room_id, table.c.outcome)
+            query = (
+                select(bucket, *dimensions, func.count())
+                .where(table.c.timestamp >= start, table.c.timestamp < end)
+                .group_by(bucket, *dimensions)
+            )
+            for minute, service, level, room_id, outcome, count in conn.execute(query):
+                if isinstance(minute, str):
+                    minute = datetime.fromisoformat(minute)
+                minutes[_key(to_utc(minute), service, level, room_id, outcome)] += count
+
+        for model in MODELS.values():
+            conn.execute(delete(model).where(model.bucket >= start, model.bucket < end))
+        apply(conn, minutes)
+    return sum(minutes.values())
+
+
+def upgrade_schema(engine) -> bool:
+    """
+    Recria as tabelas de agregados gravadas com uma chave antiga (sem todas as
+    colunas de KEY) e as recalcula a partir dos logs guardados no banco e nos
+    segmentos arquivados (ver `backfill`). Devolve True se houve recriação.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        outdated = [
+            model for model in MODELS.values()
+            if inspector.has_table(model.__tablename__)
+            and set(KEY) - {column["name"] for column in inspector.get_columns(model.__tablename__)}
+        ]
+        if not outdated:
+            return False
+        for model in MODELS.values():
+            model.__table__.drop(conn, checkfirst=True)
+            model.__table__.create(conn)
+        oldest = [
+            conn.execute(select(func.min(table.c.timestamp))).scalar()
+            for table in partitions.tables_for_range(conn)
+        ]
+    oldest = [value for value in oldest if value is not None]
+    segments = archive.list_segments(settings.LOG_ARCHIVE_DIR)
+    if segments:
+        oldest.append(segments[0]["min_ts"])
+    counted = 0
+    if oldest:
+        start = min(to_utc(datetime.fromisoformat(value) if isinstance(value, str) else value) for value in oldest)
+        counted = backfill(engine, start, datetime.now(timezone.utc))
+    print(f"Agregados recriados com as dimensões {KEY} a partir de {counted} logs.")
+    return True
+
+
+def prune(engine, minute_retention_days: int, now: datetime | None = None) -> int:
+    """Remove agregados por minuto antigos (os por hora são mantidos)."""
+    if minute_retention_days <= 0:
+        return 0
+    cutoff = to_utc(now or datetime.now(timezone.utc)) - timedelta(days=minute_retention_days)
+    with engine.begin() as conn:
+        return conn.execute(delete(models.LogRollupMinute).where(models.LogRollupMinute.bucket < cutoff)).rowcount
@@ -2,18 +2,77 @@
 # ARQUIVO: schemas.py
 # DESCRIÇÃO: Modelos Pydantic para validação de dados da API.
 # -----------------------------------------------------------------------------
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
+from typing import Any
+
+def reject_nul(value):
+    """Recusa o caractere NUL, que o PostgreSQL não aceita em texto (nem no COPY)."""
+    if isinstance(value, str):
+        if "\x00" in value:
+            raise ValueError("caractere NUL não é permitido")
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            reject_nul(key)
+            reject_nul(item)
+    elif isinstance(value, list):
+        for item in value:
+            reject_nul(item)
+    return value
 
 class LogCreate(BaseModel):
-    service_name: str
+    # Limites iguais aos das colunas (models.Log): um valor maior é recusado
+    # aqui, com 422 indicando o log, em vez de derrubar o lote no banco.
+    service_name: str = Field(max_length=50)
     user_id: int | None = None
-    level: str = "INFO"
-    message: str
+    level: str = Field("INFO", max_length=20)
+    message: str = Field(max_length=512)
+    # Momento em que o evento ocorreu no serviço de origem. Se omitido, usa o
+    # instante do recebimento (útil para quem envia logs em lote/atrasados).
+    timestamp: datetime | None = None
+    # Campos estruturados opcionais (ver models.Log).
+    mac_address: str | None = Field(None, max_length=17)
+    room_id: int | None = None
+    command: str | None = Field(None, max_length=50)
+    outcome: str | None = Field(None, max_length=20)
+    latency_ms: float | None = None
+    extras: dict[str, Any] | None = None
+
+    _reject_nul = field_validator(
+        "service_name", "level", "message", "mac_address", "command", "outcome", "extras",
+    )(reject_nul)
 
 class LogResponse(LogCreate):
     id: int
     timestamp: datetime
 
     class Config:
-        from_attributes = True # Antigo orm_mode
\ No newline at end of file
+        from_attributes = True # Antigo orm_mode
+
+class LogSearchHit(LogResponse):
+    # Relevância do log para a busca (maior = mais relevante).
+    score: float
+
+class BatchResult(BaseModel):
+    received: int
+    inserted: int
+
+class LogAccepted(BaseModel):
+    # Resposta de POST /log/ no modo write-behind: o log ainda não tem id.
+    status: str # "queued" (no buffer) ou "committed" (gravado no banco)
+    buffered: int
+
+class LogPage(BaseModel):
+    items: list[LogResponse]
+    next_cursor: str | None = None
+
+class RollupPoint(BaseModel):
+    bucket: datetime
+    service_name: str
+    level: str
+    room_id: int | None = None
+    outcome: str | None = None
+    count: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Os módulos do serviço são importados pelo nome (como no uvicorn main:app).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest  # noqa: E402
+import models  # noqa: E402
+import partitions  # noqa: E402
+import rollups  # noqa: E402
+import text_index  # noqa: E402
+from database import settings  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Banco SQLite novo, preparado como no startup do main.py (partições mensais)."""
+    monkeypatch.setattr(settings, "LOG_PARTITION_INTERVAL", partitions.INTERVAL_MONTH)
+    engine = create_engine(f"sqlite:///{tmp_path / 'log.db'}")
+    partitions.setup(engine)
+    models.Base.metadata.create_all(bind=engine)
+    partitions.ensure_partitions(engine)
+    with engine.connect() as conn:
+        text_index.setup(engine, [table.name for table in partitions.tables_for_range(conn)])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rollups.attach(session_factory)
+    return session_factory
+
+
+@pytest.fixture
+def insert_logs(session_factory):
+    """Grava, numa transação, logs dados como pares (mensagem, timestamp)."""
+    def insert(*logs, **fields):
+        rows = [
+            {column: None for column in ingest.COLUMNS}
+            | {"service_name": "teste", "level": "INFO", "message": message, "timestamp": timestamp}
+            | fields
+            for message, timestamp in logs
+        ]
+        db = session_factory()
+        try:
+            ingest.bulk_insert_logs(db, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    return insert
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import archive
+import partitions
+from database import settings
+from queries import LogFilters
+
+
+@pytest.fixture
+def old_period(engine):
+    """Início de um período já encerrado há mais de 30 dias."""
+    return partitions.period_start(datetime.now(timezone.utc) - timedelta(days=90))
+
+
+def archived_messages(archive_dir, **filters):
+    return [row["message"] for row in archive.iter_rows(str(archive_dir), LogFilters(**filters))]
+
+
+def test_archive_writes_segment_and_drops_partition(engine, insert_logs, old_period, tmp_path):
+    insert_logs(("a", old_period + timedelta(hours=1)), ("b", old_period + timedelta(hours=2)))
+    insert_logs(("agora", datetime.now(timezone.utc)))
+
+    archived = archive.archive_partitions(engine, str(tmp_path / "archive"), after_days=30)
+
+    name = partitions.partition_name(old_period)
+    assert [index["partition"] for index in archived] == [name]
+    assert archived[0]["rows"] == 2
+    assert archived[0]["codec"] == archive.default_codec()
+    with engine.connect() as conn:
+        assert name not in [partition for partition, _, _ in partitions.list_partitions(conn)]
+    # O índice publicado é o que a leitura enxerga.
+    assert [index["segment"] for index in archive.list_segments(str(tmp_path / "archive"))] == [archived[0]["segment"]]
+    assert archived_messages(tmp_path / "archive") == ["a", "b"]
+
+
+def test_archive_read_back_applies_filters(engine, insert_logs, old_period, tmp_path):
+    insert_logs(("porta", old_period + timedelta(hours=1)), room_id=7)
+    insert_logs(("outra", old_period + timedelta(hours=2)), room_id=8)
+    archive.archive_partitions(engine, str(tmp_path), after_days=30)
+
+    assert archived_messages(tmp_path, room_id=7) == ["porta"]
+    assert archived_messages(tmp_path, start=old_period + timedelta(hours=2)) == ["outra"]
+    assert archived_messages(tmp_path, end=old_period) == []
+
+
+def test_archive_read_back_skips_blocks_outside_the_range(engine, insert_logs, old_period, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_BLOCK_ROWS", 2)
+    insert_logs(*[(f"m{i}", old_period + timedelta(hours=i)) for i in range(5)])
+    [index] = archive.archive_partitions(engine, str(tmp_path), after_days=30)
+    assert [block["rows"] for block in index["blocks"]] == [2, 2, 1]
+
+    decompressed = []
+    decompress = archive._decompress
+    monkeypatch.setattr(archive, "_decompress", lambda codec, data: decompressed.append(len(data)) or decompress(codec, data))
+
+    assert archived_messages(tmp_path, start=old_period + timedelta(hours=4)) == ["m4"]
+    assert len(decompressed) == 1
+
+
+def test_gzip_segment_is_read_back(engine, insert_logs, old_period, tmp_path):
+    insert_logs(("a", old_period + timedelta(hours=1)))
+    with engine.begin() as conn:
+        index = archive.archive_partition(conn, partitions.partition_name(old_period), str(tmp_path), archive.CODEC_GZIP)
+
+    assert index["segment"].endswith(archive.EXTENSIONS[archive.CODEC_GZIP])
+    assert archived_messages(tmp_path) == ["a"]
+
+
+def test_late_logs_go_to_a_new_segment_without_repeating_ids(engine, insert_logs, old_period, tmp_path):
+    insert_logs(("a", old_period + timedelta(hours=1)))
+    [first] = archive.archive_partitions(engine, str(tmp_path), after_days=30)
+    insert_logs(("atrasado", old_period + timedelta(hours=3)))
+    [second] = archive.archive_partitions(engine, str(tmp_path), after_days=30)
+
+    assert first["segment"] != second["segment"]
+    rows = list(archive.iter_rows(str(tmp_path), LogFilters()))
+    assert [row["message"] for row in rows] == ["a", "atrasado"]
+    assert rows[1]["id"] > rows[0]["id"]
+
+
+def test_empty_partition_is_dropped_without_segment(engine, old_period, tmp_path):
+    with engine.begin() as conn:
+        partitions.create_partition(conn, old_period)
+
+    assert archive.archive_partitions(engine, str(tmp_path), after_days=30) == []
+    assert archive.list_segments(str(tmp_path)) == []
+    with engine.connect() as conn:
+        assert partitions.partition_name(old_period) not in [name for name, _, _ in partitions.list_partitions(conn)]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+import broadcast
+import ingest
+import partitions
+
+
+class Recorder:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, logs):
+        if logs:
+            self.published.extend(logs)
+
+
+def test_batch_rows_reach_the_stream_with_their_ids(engine, session_factory):
+    recorder = Recorder()
+    broadcast.attach(session_factory, recorder)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {column: None for column in ingest.COLUMNS}
+        | {"service_name": "teste", "level": "INFO", "message": message, "timestamp": timestamp}
+        for message, timestamp in (("a", now), ("b", now - timedelta(days=90)), ("c", now))
+    ]
+
+    with session_factory() as db:
+        assert ingest.bulk_insert_logs(db, rows) == 3
+        assert recorder.published == []
+        db.commit()
+
+    with engine.connect() as conn:
+        stored = {
+            message: log_id
+            for table in partitions.tables_for_range(conn)
+            for log_id, message in conn.execute(select(table.c.id, table.c.message))
+        }
+    assert {log["message"]: log["id"] for log in recorder.published} == stored
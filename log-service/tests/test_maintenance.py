@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import archive
+import maintenance
+import partitions
+from database import settings
+from queries import LogFilters
+
+
+def partition_names(engine):
+    with engine.connect() as conn:
+        return [name for name, _, _ in partitions.list_partitions(conn)]
+
+
+def test_run_maintenance_archives_before_retention(engine, insert_logs, tmp_path, monkeypatch):
+    old = partitions.period_start(datetime.now(timezone.utc) - timedelta(days=90))
+    insert_logs(("antigo", old + timedelta(hours=1)))
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_AFTER_DAYS", 30)
+    monkeypatch.setattr(settings, "LOG_RETENTION_DAYS", 60)
+
+    summary = maintenance.run_maintenance(engine)
+
+    # A partição foi arquivada; a retenção não tinha mais o que remover.
+    assert summary["archived"] == [partitions.partition_name(old)]
+    assert summary["dropped"] == []
+    assert [row["message"] for row in archive.iter_rows(str(tmp_path), LogFilters())] == ["antigo"]
+    assert partitions.partition_name(old) not in partition_names(engine)
+
+
+def test_run_maintenance_applies_retention(engine, insert_logs, tmp_path, monkeypatch):
+    old = partitions.period_start(datetime.now(timezone.utc) - timedelta(days=90))
+    insert_logs(("antigo", old + timedelta(hours=1)))
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "LOG_RETENTION_DAYS", 60)
+
+    summary = maintenance.run_maintenance(engine)
+
+    assert summary["archived"] == []
+    assert summary["dropped"] == [partitions.partition_name(old)]
+    assert archive.list_segments(str(tmp_path)) == []
+
+
+def test_run_maintenance_precreates_partitions(engine, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_PARTITION_PRECREATE", settings.LOG_PARTITION_PRECREATE + 1)
+
+    summary = maintenance.run_maintenance(engine)
+
+    assert len(summary["partitions"]) == settings.LOG_PARTITION_PRECREATE + 1
+    assert set(summary["partitions"]) <= set(partition_names(engine))
+
+
+def test_worker_keeps_running_after_a_failure(engine, monkeypatch):
+    calls = []
+    done = threading.Event()
+
+    def run(engine):
+        calls.append(engine)
+        if len(calls) == 1:
+            raise RuntimeError("banco indisponível")
+        done.set()
+
+    monkeypatch.setattr(maintenance, "run_maintenance", run)
+    worker = maintenance.MaintenanceWorker(engine, interval=0.01)
+    worker.start()
+    try:
+        assert done.wait(5)
+    finally:
+        worker.stop()
+    assert not worker._thread.is_alive()
+    assert calls[0] is engine
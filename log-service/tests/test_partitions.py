@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+import partitions
+
+
+def messages_by_table(engine):
+    with engine.connect() as conn:
+        return {
+            table.name: sorted(conn.execute(select(table.c.message)).scalars())
+            for table in partitions.tables_for_range(conn)
+        }
+
+
+def test_rows_are_routed_to_the_partition_of_their_period(engine, insert_logs):
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=90)
+    insert_logs(("agora", now), ("antigo", old))
+
+    stored = messages_by_table(engine)
+    assert stored[partitions.partition_name(partitions.period_start(now))] == ["agora"]
+    # A partição de um período passado é criada sob demanda.
+    assert stored[partitions.partition_name(partitions.period_start(old))] == ["antigo"]
+    assert stored[partitions.PARENT] == []
+
+
+def test_ids_do_not_repeat_across_partitions(engine, insert_logs):
+    now = datetime.now(timezone.utc)
+    insert_logs(("agora", now), ("antigo", now - timedelta(days=90)))
+
+    with engine.connect() as conn:
+        ids = [
+            log_id
+            for table in partitions.tables_for_range(conn)
+            for log_id in conn.execute(select(table.c.id)).scalars()
+        ]
+    assert len(ids) == len(set(ids)) == 2
+
+
+def test_expired_rows_are_discarded(engine, insert_logs):
+    now = datetime.now(timezone.utc)
+    expired = now - timedelta(days=partitions.settings.LOG_RETENTION_DAYS + 60)
+    insert_logs(("agora", now), ("expirado", expired))
+
+    stored = messages_by_table(engine)
+    assert sum(stored.values(), []) == ["agora"]
+    # A partição removida pela retenção não é recriada.
+    assert partitions.partition_name(partitions.period_start(expired)) not in stored
+
+
+def test_tables_for_range_prunes_partitions_outside_the_range(engine, insert_logs):
+    now = datetime.now(timezone.utc)
+    old = partitions.period_start(now - timedelta(days=90))
+    insert_logs(("antigo", old + timedelta(days=1)))
+
+    with engine.connect() as conn:
+        names = [table.name for table in partitions.tables_for_range(conn, old, partitions.period_end(old))]
+        all_names = [table.name for table in partitions.tables_for_range(conn)]
+    # Só a partição do período e a tabela original (logs anteriores ao particionamento).
+    assert names == [partitions.partition_name(old), partitions.PARENT]
+    assert len(all_names) == partitions.settings.LOG_PARTITION_PRECREATE + 3
+    # Da mais recente para a mais antiga.
+    assert all_names[:-1] == sorted(all_names[:-1], reverse=True)
+
+
+def test_drop_expired_removes_whole_partitions(engine, insert_logs):
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=90)
+    insert_logs(("agora", now), ("antigo", old))
+
+    dropped = partitions.drop_expired(engine, retention_days=30)
+
+    old_name = partitions.partition_name(partitions.period_start(old))
+    assert dropped == [old_name]
+    stored = messages_by_table(engine)
+    assert old_name not in stored
+    assert sum(stored.values(), []) == ["agora"]
+
+
+def test_drop_expired_is_disabled_with_zero_days(engine, insert_logs):
+    insert_logs(("antigo", datetime.now(timezone.utc) - timedelta(days=90)))
+
+    assert partitions.drop_expired(engine, retention_days=0) == []
+    assert sum(messages_by_table(engine).values(), []) == ["antigo"]
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import archive
+import ingest
+import partitions
+import rollups
+from database import settings
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_DIR", str(tmp_path / "archive"))
+    return settings.LOG_ARCHIVE_DIR
+
+
+@pytest.fixture
+def old_period(engine):
+    return partitions.period_start(datetime.now(timezone.utc) - timedelta(days=90))
+
+
+def hourly_total(engine, start, end):
+    with engine.connect() as conn:
+        return sum(point["count"] for point in rollups.series(conn, rollups.HOUR, start, end))
+
+
+def test_rollups_are_applied_after_commit(engine, insert_logs, session_factory, old_period):
+    insert_logs(("a", old_period), ("b", old_period + timedelta(minutes=1)))
+    assert hourly_total(engine, old_period, old_period + timedelta(hours=1)) == 2
+
+    db = session_factory()
+    ingest.bulk_insert_logs(db, [{column: None for column in ingest.COLUMNS}
+                                 | {"service_name": "teste", "message": "c", "timestamp": old_period}])
+    db.rollback()
+    db.close()
+    assert hourly_total(engine, old_period, old_period + timedelta(hours=1)) == 2
+
+
+def test_rollup_failure_does_not_lose_logs(engine, insert_logs, old_period, monkeypatch):
+    def fail(conn, minutes):
+        raise RuntimeError("linha travada")
+
+    monkeypatch.setattr(rollups, "apply", fail)
+    insert_logs(("a", old_period))
+
+    with engine.connect() as conn:
+        assert conn.execute(partitions.partition_table(partitions.partition_name(old_period)).select()).all()
+    assert hourly_total(engine, old_period, old_period + timedelta(hours=1)) == 0
+
+
+def test_backfill_reads_archived_segments(engine, insert_logs, old_period, archive_dir):
+    insert_logs(("a", old_period), ("b", old_period + timedelta(hours=2)))
+    archive.archive_partitions(engine, archive_dir, after_days=30)
+    insert_logs(("atrasado", old_period + timedelta(hours=2)))
+
+    counted = rollups.backfill(engine, old_period, partitions.period_end(old_period))
+
+    assert counted == 3
+    assert hourly_total(engine, old_period, partitions.period_end(old_period)) == 3
+
+
+def test_backfill_keeps_buckets_of_dropped_partitions(engine, insert_logs, old_period, monkeypatch):
+    insert_logs(("a", old_period), ("b", old_period + timedelta(hours=2)))
+    monkeypatch.setattr(settings, "LOG_RETENTION_DAYS", 30)
+    partitions.drop_expired(engine, settings.LOG_RETENTION_DAYS)
+
+    rollups.backfill(engine, old_period, datetime.now(timezone.utc))
+
+    # Os logs não existem mais; os agregados do período são o único registro.
+    assert hourly_total(engine, old_period, partitions.period_end(old_period)) == 2
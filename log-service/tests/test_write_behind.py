@@ -0,0 +1,111 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+import ingest
+import partitions
+from write_behind import FlushError, WriteBehindBuffer
+
+
+def row(message):
+    return {
+        "timestamp": datetime.now(timezone.utc), "service_name": "teste", "user_id": None, "level": "INFO",
+        "message": message, "mac_address": None, "room_id": None, "command": None, "outcome": None,
+        "latency_ms": None, "extras": None,
+    }
+
+
+def stored_messages(engine):
+    with engine.connect() as conn:
+        return sorted(
+            message
+            for table in partitions.tables_for_range(conn)
+            for message in conn.execute(select(table.c.message)).scalars()
+        )
+
+
+@pytest.fixture
+def poison(monkeypatch):
+    """Faz todo lote que contém a mensagem 'veneno' falhar como um erro de dados."""
+    bulk_insert_logs = ingest.bulk_insert_logs
+
+    def insert(db, rows):
+        if any(r["message"] == "veneno" for r in rows):
+            raise ValueError("linha inválida")
+        return bulk_insert_logs(db, rows)
+
+    monkeypatch.setattr(ingest, "bulk_insert_logs", insert)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_poison_row_is_isolated_and_rejected(engine, session_factory, poison):
+    buffer = WriteBehindBuffer(session_factory, flush_interval_ms=10, max_attempts=2)
+    buffer.start()
+    for message in ["a", "b", "veneno", "c", "d"]:
+        buffer.submit(row(message))
+    assert wait_until(lambda: buffer.metrics()["rejected"] == 1)
+    buffer.submit(row("depois"))
+    buffer.stop()
+
+    assert stored_messages(engine) == ["a", "b", "c", "d", "depois"]
+    assert buffer.metrics()["depth"] == 0
+
+
+def test_waiter_of_poison_row_gets_error_and_others_commit(engine, session_factory, poison):
+    buffer = WriteBehindBuffer(session_factory, flush_interval_ms=10)
+    buffer.start()
+    buffer.submit(row("ok"), wait=True)
+    with pytest.raises(FlushError):
+        buffer.submit(row("veneno"), wait=True)
+    buffer.stop()
+    assert stored_messages(engine) == ["ok"]
+
+
+def test_transient_failure_keeps_rows_until_database_returns(engine, session_factory, monkeypatch):
+    bulk_insert_logs = ingest.bulk_insert_logs
+    failures = {"left": 3}
+
+    def flaky(db, rows):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise OperationalError("INSERT", {}, Exception("banco fora do ar"))
+        return bulk_insert_logs(db, rows)
+
+    monkeypatch.setattr(ingest, "bulk_insert_logs", flaky)
+    buffer = WriteBehindBuffer(session_factory, flush_interval_ms=10, max_attempts=1)
+    buffer.start()
+    for message in ["a", "b", "c"]:
+        buffer.submit(row(message))
+    assert wait_until(lambda: buffer.metrics()["flushed"] == 3)
+    buffer.stop()
+    assert buffer.metrics()["rejected"] == 0
+    assert stored_messages(engine) == ["a", "b", "c"]
+
+
+def test_commit_waiter_does_not_wait_for_flush_interval(engine, session_factory):
+    buffer = WriteBehindBuffer(session_factory, flush_interval_ms=5000)
+    buffer.start()
+    started = time.monotonic()
+    buffer.submit(row("duravel"), wait=True)
+    elapsed = time.monotonic() - started
+    buffer.stop()
+    assert elapsed < 1
+    assert stored_messages(engine) == ["duravel"]
+
+
+def test_stop_flushes_buffered_rows(engine, session_factory):
+    buffer = WriteBehindBuffer(session_factory, flush_interval_ms=5000)
+    buffer.start()
+    for message in ["a", "b"]:
+        buffer.submit(row(message))
+    buffer.stop()
+    assert stored_messages(engine) == ["a", "b"]
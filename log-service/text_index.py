@@ -0,0 +1,158 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: text_index.py
+# DESCRIÇÃO: Índice de texto sobre a coluna 'message' dos logs, usado pela busca
+# (GET /logs/search).
+#
+# - PostgreSQL: índice GIN sobre to_tsvector('simple', message) para busca por
+#   palavras (com ranking via ts_rank) e, se a extensão pg_trgm estiver
+#   disponível, um índice de trigramas que atende ILIKE '%trecho%'. Os índices
+#   ficam na tabela mãe e valem para todas as partições.
+# - SQLite: uma tabela FTS5 de conteúdo externo por tabela de logs
+#   ('<tabela>_fts'), mantida em dia por gatilhos, com ranking via bm25.
+#
+# Em ambos os casos o índice é atualizado pelo próprio banco a cada INSERT
+# (inclusive no COPY e nos lotes), sem passo extra na ingestão.
+# -----------------------------------------------------------------------------
+from sqlalchemy import column, func, literal, literal_column, select, table as sql_table, text
+
+import models
+
+CONFIG = literal_column("'simple'::regconfig")
+
+_fts5 = None  # o SQLite em uso foi compilado com FTS5?
+_trigram = False  # pg_trgm disponível no PostgreSQL?
+
+
+def fts_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def _has_fts5(conn) -> bool:
+    global _fts5
+    if _fts5 is None:
+        options = conn.execute(text("PRAGMA compile_options")).scalars().all()
+        _fts5 = "ENABLE_FTS5" in options
+        if not _fts5:
+            print("AVISO: SQLite sem FTS5; a busca de logs fará varredura com LIKE.")
+    return _fts5
+
+
+def create_for_table(conn, table_name: str) -> bool:
+    """
+    SQLite: cria o índice FTS5 de uma tabela de logs e os gatilhos que o mantêm
+    sincronizado. Se a tabela já tinha dados, o índice é preenchido na hora.
+    Retorna True se o índice foi criado agora.
+    """
+    if conn.dialect.name != "sqlite" or not _has_fts5(conn):
+        return False
+    fts = fts_name(table_name)
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+    ).first()
+    if not exists:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5(message, content='{table_name}', content_rowid='id')"
+        ))
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF message ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message); "
+        f"INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message); END"
+    ))
+    return not exists
+
+
+def drop_for_table(conn, table_name: str):
+    """SQLite: remove o índice FTS5 de uma tabela de logs (os gatilhos caem junto com a tabela)."""
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"DROP TABLE IF EXISTS {fts_name(table_name)}"))
+
+
+def setup(engine, table_names: list[str]):
+    """Garante os índices de texto das tabelas de logs existentes (roda no startup)."""
+    global _trigram
+    if engine.dialect.name == "postgresql":
+        parent = models.Log.__tablename__
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{parent}_message_tsv ON {parent} "
+                f"USING GIN (to_tsvector('simple'::regconfig, message))"
+            ))
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{parent}_message_trgm ON {parent} "
+                    f"USING GIN (message gin_trgm_ops)"
+                ))
+            _trigram = True
+        except Exception as e:
+            print(f"AVISO: pg_trgm indisponível, busca por trecho sem índice: {e}")
+    elif engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            for name in table_names:
+                if create_for_table(conn, name):
+                    print(f"Índice de texto criado para '{name}'.")
+
+
+# --- Consulta ---
+
+def terms(query: str) -> list[str]:
+    """Separa a busca em termos; termos só com pontuação são ignorados."""
+    return [term for term in query.split() if any(char.isalnum() for char in term)]
+
+
+def _fts5_query(words: list[str]) -> str:
+    # Cada termo vira uma frase entre aspas: "aa:bb:cc" casa os tokens aa, bb, cc
+    # em sequência, e a sintaxe do FTS5 (AND, OR, NEAR, *) não é interpretada.
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def _like_pattern(word: str) -> str:
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_select(conn, table, words: list[str], substring: bool = False):
+    """
+    SELECT das linhas de `table` que contêm todos os termos, com a coluna
+    'score' (maior = mais relevante). Sem `substring`, busca por palavras
+    usando o índice de texto; com `substring`, casa trechos de palavras.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql" and not substring:
+        tsquery = func.phraseto_tsquery(CONFIG, words[0])
+        for word in words[1:]:
+            tsquery = tsquery.op("&&")(func.phraseto_tsquery(CONFIG, word))
+        vector = func.to_tsvector(CONFIG, table.c.message)
+        score = func.ts_rank(vector, tsquery)
+        return select(table, score.label("score")).where(vector.op("@@")(tsquery))
+
+    if dialect == "sqlite" and not substring and _has_fts5(conn):
+        fts = sql_table(fts_name(table.name), column("rowid"))
+        fts_ref = literal_column(fts.name)
+        # bm25 é negativo (menor = melhor); invertido para seguir a convenção de 'score'.
+        score = -func.bm25(fts_ref)
+        return (
+            select(table, score.label("score"))
+            .select_from(table.join(fts, fts.c.rowid == table.c.id))
+            .where(fts_ref.op("MATCH")(_fts5_query(words)))
+        )
+
+    conditions = [
+        (table.c.message.ilike if dialect == "postgresql" else table.c.message.like)(_like_pattern(word), escape="\\")
+        for word in words
+    ]
+    if dialect == "postgresql" and _trigram:
+        score = func.similarity(table.c.message, " ".join(words))
+    else:
+        score = literal(0.0)
+    return select(table, score.label("score")).where(*conditions)
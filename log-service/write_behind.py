@@ -0,0 +1,204 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: write_behind.py
+# DESCRIÇÃO: Buffer "write-behind" do Log Service. Os logs aceitos por
+# POST /log/ ficam em memória e uma thread os grava em transações agrupadas
+# (a cada N ms ou M linhas), diluindo o custo de commit/fsync entre vários
+# eventos. Quando há alguém esperando o commit (durabilidade "commit"), o lote
+# é gravado na hora: os logs que chegam enquanto ele grava formam o próximo.
+#
+# Se um lote falha por problema de conexão com o banco, ele volta inteiro para
+# o buffer. Qualquer outro erro é dos dados: o lote é dividido ao meio até
+# isolar as linhas que falham sozinhas, que são descartadas (contador
+# 'rejected') depois de `max_attempts` tentativas, sem travar os demais logs.
+# -----------------------------------------------------------------------------
+import threading
+import time
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+import ingest
+
+DURABILITY_BUFFER = "buffer"  # responde assim que o log entra no buffer
+DURABILITY_COMMIT = "commit"  # responde depois do commit do lote que contém o log
+
+
+class BufferFull(Exception):
+    pass
+
+
+class FlushError(Exception):
+    pass
+
+
+# Erros de conexão/banco fora do ar: o lote é mantido sem dividir.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class _Flush:
+    """Sinaliza, para quem está esperando, o resultado do commit do seu log."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteBehindBuffer:
+    def __init__(self, session_factory, flush_interval_ms=200, max_rows=1000, max_pending=50000, max_attempts=3):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+
+        self._cond = threading.Condition()
+        self._rows = []  # (linha, _Flush de quem espera ou None, tentativas com erro)
+        self._waiters = 0  # linhas no buffer com alguém esperando o commit
+        self._stopping = False
+        self._thread = None
+        self.stats = {"accepted": 0, "flushed": 0, "flushes": 0, "failed_flushes": 0, "rejected": 0,
+                      "last_flush_ms": None}
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Para de aceitar novos logs e grava tudo o que ainda está no buffer."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # --- API pública ---
+
+    def depth(self):
+        with self._cond:
+            return len(self._rows)
+
+    def submit(self, row, wait=False, timeout=5.0):
+        """
+        Coloca uma linha no buffer. Com `wait=True` só retorna depois do commit
+        do lote (FlushError se ele falhar). Se o buffer estiver cheio por mais de
+        `timeout` segundos, levanta BufferFull.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._rows) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if self._stopping or remaining <= 0:
+                    raise BufferFull()
+                self._cond.wait(remaining)
+            if self._stopping:
+                raise BufferFull()
+            flush = _Flush() if wait else None
+            self._rows.append((row, flush, 0))
+            self.stats["accepted"] += 1
+            if flush is not None:
+                self._waiters += 1
+            if flush is not None or len(self._rows) >= self.max_rows:
+                self._cond.notify_all()
+
+        if flush is not None:
+            if not flush.done.wait(timeout + self.flush_interval):
+                raise FlushError("Tempo esgotado aguardando o commit do lote.")
+            if flush.error is not None:
+                raise FlushError(str(flush.error))
+
+    def metrics(self):
+        with self._cond:
+            data = dict(self.stats)
+            data["depth"] = len(self._rows)
+        data["capacity"] = self.max_pending
+        return data
+
+    # --- Internos ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._rows) < self.max_rows and not self._waiters:
+                    self._cond.wait(self.flush_interval)
+                if not self._rows:
+                    if self._stopping:
+                        return
+                    continue
+                rows = self._rows[:self.max_rows]
+                del self._rows[:self.max_rows]
+                self._waiters -= sum(1 for _, waiter, _ in rows if waiter is not None)
+                # Libera quem está aguardando espaço no buffer.
+                self._cond.notify_all()
+            self._write(rows)
+
+    def _commit(self, rows):
+        """Grava as linhas numa transação; devolve o erro, ou None se deu certo."""
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            ingest.bulk_insert_logs(db, [row for row, _, _ in rows])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.stats["failed_flushes"] += 1
+            return e
+        finally:
+            db.close()
+        self.stats["flushes"] += 1
+        self.stats["flushed"] += len(rows)
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        for _, waiter, _ in rows:
+            if waiter is not None:
+                waiter.done.set()
+        return None
+
+    def _write(self, rows):
+        error = self._commit(rows)
+        if error is None:
+            return
+        print(f"ERRO: Falha ao gravar lote de {len(rows)} logs: {error}")
+        if isinstance(error, TRANSIENT_ERRORS):
+            failed = [(item, error) for item in rows]
+        else:
+            failed = self._isolate(rows, error)
+        retry = []
+        for (row, waiter, attempts), e in failed:
+            if waiter is not None:
+                # Quem aguardava o commit recebe o erro (e pode reenviar).
+                waiter.error = e
+                waiter.done.set()
+            elif isinstance(e, TRANSIENT_ERRORS) or attempts + 1 < self.max_attempts:
+                # Log já confirmado ao cliente: volta para o buffer.
+                retry.append((row, None, attempts if isinstance(e, TRANSIENT_ERRORS) else attempts + 1))
+            else:
+                self.stats["rejected"] += 1
+                print(f"ERRO: Log descartado após {attempts + 1} falhas ({e}): {str(row.get('message'))[:100]!r}")
+        if not retry:
+            return
+        if self._stopping:
+            print(f"ERRO: Encerrando com {len(retry)} logs não gravados.")
+            return
+        with self._cond:
+            self._rows[:0] = retry
+        time.sleep(self.flush_interval)
+
+    def _isolate(self, rows, error):
+        """
+        Divide um lote que falhou até isolar as linhas que falham sozinhas,
+        gravando as metades boas. Devolve pares (linha, erro) das que falharam.
+        """
+        if len(rows) == 1:
+            return [(rows[0], error)]
+        failed = []
+        middle = len(rows) // 2
+        for half in (rows[:middle], rows[middle:]):
+            half_error = self._commit(half)
+            if half_error is None:
+                continue
+            if isinstance(half_error, TRANSIENT_ERRORS):
+                failed.extend((item, half_error) for item in half)
+            else:
+                failed.extend(self._isolate(half, half_error))
+        return failed
@@ -0,0 +1,122 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/event_consumer.py
+# DESCRIÇÃO: Vazão do consumidor de 'user_events' numa sincronização em massa
+# (milhares de user_created/user_updated), comparando o processamento antigo
+# (uma mensagem por vez: update_or_create + get_or_create + ack individual)
+# com o consumo em lotes de event_consumer.consume.
+#
+# Usa um broker falso em memória (sem RabbitMQ) e um banco de teste criado
+# pelo Django (SQLite em memória com as settings padrão), então nada toca o
+# db.sqlite3. Rode a partir da pasta persistence-service:
+#   python benchmarks/event_consumer.py --events 20000 --batch-size 200
+# -----------------------------------------------------------------------------
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_consumer  # noqa: E402  (configura o Django)
+from django.db import connection  # noqa: E402
+
+from profiles.models import ActorUser  # noqa: E402
+
+
+class FakeChannel:
+    """Broker em memória: entrega respeitando o prefetch e conta os acks."""
+
+    def __init__(self, bodies):
+        self.messages = deque(enumerate(bodies, start=1))
+        self.prefetch = 0
+        self.acked = 0
+        self.ack_calls = 0
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch = prefetch_count
+
+    def confirm_delivery(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.ack_calls += 1
+        self.acked = delivery_tag if multiple else self.acked + 1
+
+    def consume(self, queue, inactivity_timeout=None):
+        while self.messages:
+            if self.prefetch and self.messages[0][0] - self.acked > self.prefetch:
+                yield None, None, None  # prefetch esgotado: o broker espera acks
+                continue
+            tag, body = self.messages.popleft()
+            yield SimpleNamespace(delivery_tag=tag), None, body
+        yield None, None, None
+
+
+def legacy_process(channel, tag, body):
+    """O processamento anterior, uma mensagem por vez."""
+    data = json.loads(body)
+    ActorUser.objects.update_or_create(
+        user_id=data['user_id'], defaults={'username': data['username'], 'role': data['role']}
+    )
+    model = event_consumer.ROLE_TO_MODEL.get(data['role'])
+    if model:
+        model.objects.get_or_create(user_id=data['user_id'])
+    channel.basic_ack(delivery_tag=tag)
+
+
+def make_events(total, users, first_id=1, seed=42):
+    rng = random.Random(seed)
+    roles = list(event_consumer.ROLE_TO_MODEL)
+    bodies = []
+    for i in range(total):
+        user_id = first_id + (i if i < users else rng.randrange(users))
+        bodies.append(json.dumps({
+            'event_type': 'user_created' if i < users else 'user_updated',
+            'user_id': user_id,
+            'username': f'user{user_id}',
+            'role': rng.choice(roles),
+        }).encode())
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do consumidor de eventos de usuário')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=15000, help='usuários distintos (o resto são updates)')
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    connection.creation.create_test_db(verbosity=0)
+    # Cada rodada sincroniza um intervalo próprio de usuários, sobre o mesmo banco.
+    bodies = make_events(args.events, args.users)
+    quiet = open(os.devnull, 'w')
+
+    channel = FakeChannel(bodies)
+    start = time.perf_counter()
+    for tag, body in enumerate(bodies, start=1):
+        legacy_process(channel, tag, body)
+    before = time.perf_counter() - start
+    print(f"antes (uma mensagem por vez): {args.events / before:.0f} eventos/s, {channel.ack_calls} acks")
+
+    bodies = make_events(args.events, args.users, first_id=args.users + 1)
+    channel = FakeChannel(bodies)
+    stdout, sys.stdout = sys.stdout, quiet
+    start = time.perf_counter()
+    try:
+        event_consumer.consume(channel, batch_size=args.batch_size, max_wait=60)
+    finally:
+        sys.stdout = stdout
+    after = time.perf_counter() - start
+    print(f"depois (lotes de {args.batch_size}): {args.events / after:.0f} eventos/s, {channel.ack_calls} acks")
+    print(f"Aceleração: {before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
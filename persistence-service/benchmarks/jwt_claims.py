@@ -0,0 +1,76 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: benchmarks/jwt_claims.py
+# DESCRIÇÃO: Custo de leitura do token JWT por requisição em
+# get_user_info_from_token, antes e depois do cache de claims.
+#
+# Simula o padrão das views de leitura: a permissão e a view leem o token da
+# mesma requisição (2 leituras por requisição), com um conjunto de usuários
+# ativos fazendo requisições repetidas. Rode a partir da pasta persistence-service:
+#   python benchmarks/jwt_claims.py --requests 50000 --users 200
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "persistence_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import jwt  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from persistence_project import utils  # noqa: E402
+
+
+def decode_uncached(request):
+    """Comportamento anterior: jwt.decode completo a cada leitura."""
+    token = request.COOKIES.get("access_token")
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+
+
+def run(label, read, tokens, total, reads_per_request, seed=7):
+    factory = RequestFactory()
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(total):
+        http_request = factory.get("/rooms/my-access/")
+        http_request.COOKIES["access_token"] = rng.choice(tokens)
+        requests.append(http_request)
+
+    start = time.perf_counter()
+    for http_request in requests:
+        request = Request(http_request)
+        for _ in range(reads_per_request):
+            read(request)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed / total * 1e6:.2f} µs/requisição ({total} requisições)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de JWT no Persistence Service")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=200, help="tokens distintos em uso")
+    parser.add_argument("--reads", type=int, default=2, help="leituras do token por requisição")
+    args = parser.parse_args()
+
+    exp = int(time.time()) + 3600
+    tokens = [
+        jwt.encode({"user_id": user_id, "role": "padrao", "exp": exp}, settings.SECRET_KEY, algorithm="HS256")
+        for user_id in range(args.users)
+    ]
+    before = run("antes (decode a cada leitura)", decode_uncached, tokens, args.requests, args.reads)
+    utils._claims_cache.clear()
+    after = run("depois (memo + LRU)", utils.get_user_info_from_token, tokens, args.requests, args.reads)
+    print(f"Redução: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,61 @@
 # persistence-service/persistence_project/utils.py (NOVO ARQUIVO)
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
 from django.conf import settings
 from rest_framework import exceptions
 
+# Claims já verificadas, por sha256 do token (o token em si não fica em
+# memória). Só tokens válidos entram; cada entrada vale até o 'exp' do token
+# e no máximo JWT_CLAIMS_CACHE_TTL segundos.
+_claims_cache = OrderedDict()  # digest -> (válido_até, claims)
+_claims_lock = threading.Lock()
+
+
+def _cached_claims(digest):
+    with _claims_lock:
+        entry = _claims_cache.get(digest)
+        if entry is None:
+            return None
+        valid_until, claims = entry
+        if time.time() >= valid_until:
+            del _claims_cache[digest]
+            return None
+        _claims_cache.move_to_end(digest)
+        return claims
+
+
+def _remember_claims(digest, claims):
+    valid_until = time.time() + settings.JWT_CLAIMS_CACHE_TTL
+    if 'exp' in claims:
+        valid_until = min(valid_until, float(claims['exp']))
+    with _claims_lock:
+        _claims_cache[digest] = (valid_until, claims)
+        _claims_cache.move_to_end(digest)
+        while len(_claims_cache) > settings.JWT_CLAIMS_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+
+
+def decode_token(token):
+    """Claims de um token válido; a verificação HMAC só roda na primeira vez."""
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = _cached_claims(digest)
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        if settings.JWT_CLAIMS_CACHE_SIZE > 0:
+            _remember_claims(digest, claims)
+    return dict(claims)
+
+
 def get_user_info_from_token(request):
     """
     Decodifica o token JWT lendo-o diretamente do cookie 'access_token'.
+    O resultado fica guardado na requisição: permissão e view leem o mesmo
+    token sem decodificá-lo de novo.
     """
     # MUDANÇA CRÍTICA: Lendo o token do cookie em vez do header 'Authorization'
     token = request.COOKIES.get('access_token')
@@ -15,17 +64,19 @@ def get_user_info_from_token(request):
         # Se o cookie não estiver presente, negamos o acesso.
         return None
 
+    # O memo fica no HttpRequest do Django, compartilhado com o Request do DRF.
+    http_request = getattr(request, '_request', request)
+    memo = getattr(http_request, '_token_claims', None)
+    if memo is not None and memo[0] == token:
+        return dict(memo[1])
+
     try:
-        # A lógica de decodificação permanece a mesma
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=["HS256"]
-        )
-        return payload
+        payload = decode_token(token)
     except jwt.ExpiredSignatureError:
         raise exceptions.AuthenticationFailed('Token expirado')
     except jwt.InvalidTokenError:
         raise exceptions.AuthenticationFailed('Token inválido')
     except Exception:
-        raise exceptions.AuthenticationFailed('Erro de autenticação')
\ No newline at end of file
+        raise exceptions.AuthenticationFailed('Erro de autenticação')
+    http_request._token_claims = (token, payload)
+    return dict(payload)
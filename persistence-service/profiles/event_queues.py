@@ -0,0 +1,97 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: profiles/event_queues.py
+# DESCRIÇÃO: Filas de 'user_events' para eventos que falharam.
+#
+# Um evento que falhou por um erro passageiro (banco fora do ar) vai para uma
+# fila de espera
+# ('user_events.retry.<atraso>ms') cujo TTL o devolve, por dead-lettering, à
+# fila 'user_events'. O atraso cresce a cada tentativa (EVENT_RETRY_BASE_DELAY
+# multiplicado por EVENT_RETRY_FACTOR) e a contagem viaja no header
+# 'x-retry-count'. Depois de EVENT_MAX_RETRIES tentativas, ou se a mensagem
+# estiver malformada ou violar uma restrição do banco (não adianta tentar de
+# novo), ela vai para 'user_events.dead', de onde pode ser
+# reenviada com `python manage.py replay_dead_letters`.
+#
+# O atraso faz parte do nome da fila: mudar a configuração cria filas novas
+# em vez de conflitar com os argumentos das existentes.
+# -----------------------------------------------------------------------------
+import pika
+from django.conf import settings
+
+USER_EVENTS_QUEUE = 'user_events'
+DEAD_LETTER_QUEUE = f'{USER_EVENTS_QUEUE}.dead'
+RETRY_HEADER = 'x-retry-count'
+ERROR_HEADER = 'x-last-error'
+# Propriedades AMQP preservadas quando uma mensagem é republicada.
+FORWARDED_PROPERTIES = (
+    'content_type', 'content_encoding', 'message_id', 'correlation_id', 'timestamp', 'type', 'app_id',
+)
+
+
+def retry_delays_ms():
+    """Atraso de cada tentativa, em milissegundos (um item por tentativa)."""
+    return [
+        int(settings.EVENT_RETRY_BASE_DELAY * 1000 * settings.EVENT_RETRY_FACTOR ** attempt)
+        for attempt in range(settings.EVENT_MAX_RETRIES)
+    ]
+
+
+def retry_queue(delay_ms):
+    return f'{USER_EVENTS_QUEUE}.retry.{delay_ms}ms'
+
+
+def declare_topology(channel):
+    """Declara 'user_events', as filas de espera e a fila de mensagens mortas."""
+    channel.queue_declare(queue=USER_EVENTS_QUEUE, durable=True)
+    channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True)
+    for delay in retry_delays_ms():
+        channel.queue_declare(
+            queue=retry_queue(delay),
+            durable=True,
+            arguments={
+                'x-message-ttl': delay,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': USER_EVENTS_QUEUE,
+            },
+        )
+
+
+def forward_properties(properties, headers):
+    """
+    Propriedades para republicar uma mensagem: as do original (message_id,
+    content_type...) com os `headers` informados, sempre persistente.
+    """
+    return pika.BasicProperties(
+        delivery_mode=2,
+        headers=headers,
+        **{name: getattr(properties, name, None) for name in FORWARDED_PROPERTIES},
+    )
+
+
+def retry_count(properties):
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return int(headers.get(RETRY_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def reject(channel, body, properties, error, retryable=True):
+    """
+    Encaminha uma mensagem que falhou para a próxima fila de espera ou, sem
+    tentativas restantes (ou se `retryable` for falso), para a fila de
+    mensagens mortas. Devolve o nome da fila de destino.
+    """
+    attempts = retry_count(properties) + 1
+    delays = retry_delays_ms()
+    queue = retry_queue(delays[attempts - 1]) if retryable and attempts <= len(delays) else DEAD_LETTER_QUEUE
+    headers = dict(getattr(properties, 'headers', None) or {})
+    headers[RETRY_HEADER] = attempts
+    headers[ERROR_HEADER] = str(error)[:500]
+    channel.basic_publish(
+        exchange='',
+        routing_key=queue,
+        body=body,
+        properties=forward_properties(properties, headers),
+    )
+    return queue
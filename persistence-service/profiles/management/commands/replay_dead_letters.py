@@ -0,0 +1,70 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: profiles/management/commands/replay_dead_letters.py
+# DESCRIÇÃO: Reenvia para 'user_events' as mensagens da fila de mensagens
+# mortas ('user_events.dead'), com a contagem de tentativas zerada. Use depois
+# de corrigir a causa das falhas:
+#   python manage.py replay_dead_letters [--limit N] [--dry-run]
+# -----------------------------------------------------------------------------
+import pika
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from profiles import event_queues
+
+
+def replay(channel, limit=None, batch_size=500, dry_run=False):
+    """
+    Move até `limit` mensagens da fila morta para 'user_events' (com
+    confirmação do broker) e confirma as originais em lotes. Devolve
+    (mensagens reenviadas, erros mais frequentes).
+    """
+    channel.confirm_delivery()
+    channel.basic_qos(prefetch_count=batch_size)
+    replayed, last_tag, errors = 0, None, {}
+    for method, properties, body in channel.consume(event_queues.DEAD_LETTER_QUEUE, inactivity_timeout=1):
+        if method is None:
+            break
+        headers = dict(properties.headers or {})
+        error = headers.pop(event_queues.ERROR_HEADER, 'desconhecido')
+        headers.pop(event_queues.RETRY_HEADER, None)
+        errors[error] = errors.get(error, 0) + 1
+        if not dry_run:
+            channel.basic_publish(
+                exchange='',
+                routing_key=event_queues.USER_EVENTS_QUEUE,
+                body=body,
+                properties=event_queues.forward_properties(properties, headers or None),
+            )
+            last_tag = method.delivery_tag
+        replayed += 1
+        if last_tag is not None and replayed % batch_size == 0:
+            channel.basic_ack(delivery_tag=last_tag, multiple=True)
+            last_tag = None
+        if limit is not None and replayed >= limit:
+            break
+    if last_tag is not None:
+        channel.basic_ack(delivery_tag=last_tag, multiple=True)
+    # Em --dry-run nada foi confirmado: o cancelamento devolve tudo à fila morta.
+    channel.cancel()
+    return replayed, errors
+
+
+class Command(BaseCommand):
+    help = "Reenvia para 'user_events' as mensagens da fila de mensagens mortas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Máximo de mensagens reenviadas.")
+        parser.add_argument('--dry-run', action='store_true', help="Só lista os erros das primeiras mensagens, sem reenviar.")
+
+    def handle(self, *args, **options):
+        connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
+        try:
+            channel = connection.channel()
+            event_queues.declare_topology(channel)
+            replayed, errors = replay(channel, limit=options['limit'], dry_run=options['dry_run'])
+        finally:
+            connection.close()
+        for error, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+            self.stdout.write(f"  {count:6d}  {error}")
+        verb = "encontradas" if options['dry_run'] else "reenviadas"
+        self.stdout.write(self.style.SUCCESS(f"{replayed} mensagens {verb}."))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedEvent',
+            fields=[
+                ('event_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('processed_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='actoruser',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
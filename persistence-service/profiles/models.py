@@ -24,6 +24,19 @@ class ActorUser(models.Model):
         choices=ActorUserRolesChoices.choices,
         default=ActorUserRolesChoices.USUARIO_PADRAO
     )
+    # Versão do último evento aplicado (o Auth Service publica uma versão
+    # crescente). Um evento com versão menor chegou atrasado e é ignorado.
+    version = models.BigIntegerField(default=0)
+
+
+class ProcessedEvent(models.Model):
+    """
+    Eventos de 'user_events' já aplicados, pelo 'event_id'. Uma entrega
+    repetida do mesmo evento é ignorada. As linhas mais antigas que
+    EVENT_LEDGER_RETENTION segundos são apagadas pelo consumidor.
+    """
+    event_id = models.CharField(max_length=64, primary_key=True)
+    processed_at = models.DateTimeField(db_index=True)
 
 class Coordinator(models.Model):
     user_id = models.IntegerField(unique=True)
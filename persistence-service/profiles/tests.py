@@ -1,3 +1,213 @@
-from django.test import TestCase
+import json
+from collections import deque
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import event_consumer
+from . import event_queues
+from .management.commands.replay_dead_letters import replay
+from .models import ActorUser, Admin, Common, ProcessedEvent
+
+
+class FakeChannel:
+    """Canal em memória com a parte da API do pika usada pelo consumidor."""
+
+    def __init__(self, bodies):
+        # Cada item é o corpo da mensagem ou (corpo, headers).
+        self.messages = deque(enumerate(bodies, start=1))
+        self.prefetch = None
+        self.acks = []  # (delivery_tag, multiple)
+        self.published = []  # (routing_key, body, headers)
+        self.properties = []  # propriedades de cada mensagem publicada
+        self.cancelled = False
+
+    def basic_qos(self, prefetch_count):
+        self.prefetch = prefetch_count
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks.append((delivery_tag, multiple))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.published.append((routing_key, body, properties.headers if properties else None))
+        self.properties.append(properties)
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False, arguments=None):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+    def consume(self, queue, inactivity_timeout=None):
+        while self.messages:
+            tag, body = self.messages.popleft()
+            body, headers = body if isinstance(body, tuple) else (body, None)
+            yield SimpleNamespace(delivery_tag=tag), SimpleNamespace(headers=headers, message_id=f'msg-{tag}'), body
+        yield None, None, None  # fila vazia: inatividade
+
+
+def event(user_id, role='padrao', event_type='user_created', username=None, **extra):
+    return json.dumps({
+        'event_type': event_type, 'user_id': user_id, 'username': username or f'user{user_id}', 'role': role,
+        **extra,
+    }).encode()
+
+
+class BatchConsumerTests(TestCase):
+    def test_batch_is_applied_and_acked_at_once(self):
+        bodies = [event(i) for i in range(1, 8)] + [b'{nao e json', event(1, 'administrador', 'user_updated')]
+        channel = FakeChannel(bodies)
+        event_consumer.consume(channel, batch_size=4, max_wait=60)
+
+        self.assertEqual(channel.prefetch, 4)
+        self.assertEqual(channel.acks, [(4, True), (8, True), (9, True)])
+        self.assertEqual(ActorUser.objects.count(), 7)
+        self.assertEqual(ActorUser.objects.get(user_id=1).role, 'administrador')
+        self.assertEqual(Common.objects.count(), 7)
+        self.assertTrue(Admin.objects.filter(user_id=1).exists())
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def queries(first, size):
+            bodies = [event(user_id) for user_id in range(first, first + size)]
+            with CaptureQueriesContext(connection) as captured:
+                event_consumer.process_batch(bodies)
+            return len(captured)
+
+        self.assertEqual(queries(1, 10), queries(1000, 200))
+
+    def test_failing_event_is_isolated(self):
+        ActorUser.objects.create(user_id=500, username='ocupado', role='padrao')
+        stats, failures = event_consumer.process_batch([event(1), event(2, username='ocupado'), event(3)])
+        self.assertEqual(stats, {'applied': 2, 'duplicates': 0, 'stale': 0, 'malformed': 0, 'failed': 1})
+        self.assertEqual(list(failures), [1])
+        self.assertFalse(failures[1][1])  # violação de restrição: não adianta retentar
+        self.assertEqual(sorted(ActorUser.objects.values_list('user_id', flat=True)), [1, 3, 500])
+
+
+class IdempotentConsumerTests(TestCase):
+    def test_redelivered_event_is_skipped(self):
+        created = event(1, event_id='a1', version=10)
+        stats, _ = event_consumer.process_batch([created, created])
+        self.assertEqual((stats['applied'], stats['duplicates']), (1, 1))
+
+        ActorUser.objects.filter(user_id=1).update(role='administrador')
+        stats, _ = event_consumer.process_batch([created])
+        self.assertEqual((stats['applied'], stats['duplicates']), (0, 1))
+        self.assertEqual(ActorUser.objects.get(user_id=1).role, 'administrador')
+
+    def test_late_update_does_not_regress_role(self):
+        event_consumer.process_batch([event(1, event_id='a1', version=10)])
+        promoted = event(1, 'administrador', 'user_updated', event_id='a2', version=30)
+        late = event(1, 'coordenador', 'user_updated', event_id='a3', version=20)
+
+        stats, _ = event_consumer.process_batch([promoted, late])  # fora de ordem no mesmo lote
+        self.assertEqual((stats['applied'], stats['stale']), (1, 1))
+        stats, _ = event_consumer.process_batch([event(1, 'padrao', 'user_updated', event_id='a4', version=5)])
+        self.assertEqual(stats['stale'], 1)
+
+        user = ActorUser.objects.get(user_id=1)
+        self.assertEqual((user.role, user.version), ('administrador', 30))
+        self.assertEqual(ProcessedEvent.objects.count(), 4)
+
+    @override_settings(EVENT_LEDGER_RETENTION=3600)
+    def test_ledger_is_pruned_by_age(self):
+        event_consumer.process_batch([event(1, event_id='a1'), event(2, event_id='a2')])
+        ProcessedEvent.objects.filter(event_id='a1').update(processed_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(event_consumer.prune_ledger(), 1)
+        self.assertEqual(list(ProcessedEvent.objects.values_list('event_id', flat=True)), ['a2'])
+
+
+class PartitionedConsumerTests(TestCase):
+    def test_router_keeps_each_user_on_one_partition(self):
+        bodies = [event(user_id % 7, event_type='user_updated') for user_id in range(1, 50)]
+        channel = FakeChannel(bodies)
+        event_consumer.route(channel, workers=3, batch_size=10, max_wait=60, stop=lambda: False)
+
+        self.assertEqual(len(channel.published), len(bodies))
+        partitions = {}
+        for routing_key, body, _ in channel.published:
+            partitions.setdefault(json.loads(body)['user_id'], set()).add(routing_key)
+        self.assertTrue(all(len(keys) == 1 for keys in partitions.values()))
+        # Dentro da partição, a ordem de publicação é a de chegada.
+        self.assertEqual([body for _, body, _ in channel.published], bodies)
+        self.assertEqual(channel.properties[0].message_id, 'msg-1')
+        self.assertTrue(all(properties.delivery_mode == 2 for properties in channel.properties))
+        self.assertEqual(channel.acks[-1], (len(bodies), True))
+        self.assertTrue(channel.cancelled)
+
+    def test_stop_flushes_the_batch_in_progress(self):
+        channel = FakeChannel([event(i) for i in range(1, 30)])
+        received = []
+
+        def stop():
+            received.append(1)
+            return len(received) >= 5  # parada pedida no meio de um lote
+
+        event_consumer.consume(channel, batch_size=10, max_wait=60, stop=stop)
+        self.assertEqual(channel.acks, [(5, True)])
+        self.assertEqual(ActorUser.objects.count(), 5)
+        self.assertTrue(channel.cancelled)
+
+
+@override_settings(EVENT_MAX_RETRIES=3, EVENT_RETRY_BASE_DELAY=1, EVENT_RETRY_FACTOR=4)
+class RetryAndDeadLetterTests(TestCase):
+    def setUp(self):
+        ActorUser.objects.create(user_id=500, username='ocupado', role='padrao')
+
+    def test_transient_failures_go_to_retry_queues_then_dead_letter(self):
+        apply_events = event_consumer.apply_events
+
+        def database_down_for_user_2(events):
+            if any(event['user_id'] == 2 for event in events):
+                raise OperationalError('banco fora do ar')
+            return apply_events(events)
+
+        failing = event(2)
+        channel = FakeChannel([
+            event(1),
+            failing,
+            (failing, {event_queues.RETRY_HEADER: 1}),
+            (failing, {event_queues.RETRY_HEADER: 3}),
+            b'{nao e json',
+        ])
+        with mock.patch.object(event_consumer, 'apply_events', database_down_for_user_2):
+            event_consumer.consume(channel, batch_size=10, max_wait=60, stop=lambda: False)
+
+        destinations = [(queue, headers[event_queues.RETRY_HEADER]) for queue, _, headers in channel.published]
+        self.assertEqual(destinations, [
+            ('user_events.retry.1000ms', 1),
+            ('user_events.retry.4000ms', 2),
+            (event_queues.DEAD_LETTER_QUEUE, 4),
+            (event_queues.DEAD_LETTER_QUEUE, 1),  # malformada: sem novas tentativas
+        ])
+        self.assertIn('OperationalError', channel.published[0][2][event_queues.ERROR_HEADER])
+        self.assertEqual(channel.properties[0].message_id, 'msg-2')
+        self.assertEqual(channel.acks, [(5, True)])
+        self.assertTrue(ActorUser.objects.filter(user_id=1).exists())
+
+    def test_constraint_violation_goes_straight_to_dead_letter(self):
+        channel = FakeChannel([event(1), event(2, username='ocupado')])
+        event_consumer.consume(channel, batch_size=10, max_wait=60, stop=lambda: False)
+
+        [(queue, _, headers)] = channel.published
+        self.assertEqual((queue, headers[event_queues.RETRY_HEADER]), (event_queues.DEAD_LETTER_QUEUE, 1))
+        self.assertIn('IntegrityError', headers[event_queues.ERROR_HEADER])
+        self.assertEqual(channel.acks, [(2, True)])
+
+    def test_replay_moves_dead_letters_back_with_fresh_attempts(self):
+        headers = {event_queues.RETRY_HEADER: 4, event_queues.ERROR_HEADER: 'OperationalError: banco fora'}
+        channel = FakeChannel([(event(i), dict(headers)) for i in range(1, 4)])
+        replayed, errors = replay(channel)
+        self.assertEqual(replayed, 3)
+        self.assertEqual(errors, {'OperationalError: banco fora': 3})
+        self.assertEqual({queue for queue, _, _ in channel.published}, {event_queues.USER_EVENTS_QUEUE})
+        self.assertTrue(all(headers is None for _, _, headers in channel.published))
+        self.assertEqual(channel.acks, [(3, True)])
@@ -0,0 +1,72 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/access.py
+# DESCRIÇÃO: Manutenção do índice RoomAccess (quem acessa qual sala). Em vez
+# de calcular diferenças, as linhas de uma sala são recalculadas por inteiro a
+# partir das relações: poucas consultas por sala, sempre consistentes. Cada
+# mudança é avisada ao Command Service após o commit (ver events.py).
+# -----------------------------------------------------------------------------
+from django.db import transaction
+
+from . import events, response_cache
+from .models import Room, RoomAccess
+
+Via = RoomAccess.ViaChoices
+
+
+def _access_rows(room_ids):
+    """Linhas de RoomAccess (não salvas) das salas informadas, a partir das relações."""
+    sources = [
+        (Room.admins.through.objects.filter(room_id__in=room_ids).values_list('room_id', 'admin__user_id'),
+         Via.ADMINISTRADOR),
+        (Room.users.through.objects.filter(room_id__in=room_ids).values_list('room_id', 'common__user_id'),
+         Via.USUARIO),
+        (Room.special_coordinators.through.objects.filter(room_id__in=room_ids)
+         .values_list('room_id', 'coordinator__user_id'), Via.COORDENADOR_ESPECIAL),
+        (Room.objects.filter(pk__in=room_ids, department__coordinators__isnull=False)
+         .values_list('pk', 'department__coordinators__user_id'), Via.COORDENADOR_DEPARTAMENTO),
+    ]
+    return [
+        RoomAccess(user_id=user_id, room_id=room_id, via=via)
+        for queryset, via in sources
+        for room_id, user_id in queryset
+    ]
+
+
+def refresh_rooms(room_ids):
+    """Recalcula as linhas de RoomAccess das salas informadas."""
+    room_ids = set(room_ids)
+    if not room_ids:
+        return
+    with transaction.atomic():
+        RoomAccess.objects.filter(room_id__in=room_ids).delete()
+        RoomAccess.objects.bulk_create(_access_rows(room_ids), ignore_conflicts=True)
+        events.access_changed(room_ids=room_ids)
+
+
+def refresh_departments(department_ids):
+    """Recalcula as salas dos departamentos informados (mudança de coordenadores)."""
+    refresh_rooms(Room.objects.filter(department_id__in=department_ids).values_list('pk', flat=True))
+
+
+def rebuild_all(batch_size=500):
+    """Reconstrói o índice inteiro, em lotes de salas. Retorna a quantidade de linhas."""
+    total = 0
+    with transaction.atomic():
+        RoomAccess.objects.all().delete()
+        room_ids = list(Room.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(room_ids), batch_size):
+            rows = _access_rows(room_ids[start:start + batch_size])
+            RoomAccess.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+            total += len(rows)
+        events.access_reset()
+        response_cache.bump_on_commit(response_cache.ROOMS, response_cache.DEPARTMENTS)
+    return total
+
+
+def rooms_for_user(user_id, queryset=None):
+    """
+    Salas que o usuário acessa por qualquer via, numa única busca no índice.
+    `queryset` permite partir de um queryset com select/prefetch já definidos.
+    """
+    queryset = Room.objects.all() if queryset is None else queryset
+    return queryset.filter(pk__in=RoomAccess.objects.filter(user_id=user_id).values('room_id'))
@@ -0,0 +1,152 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/events.py
+# DESCRIÇÃO: Publica no RabbitMQ (exchange fanout 'access_events') as mudanças
+# que afetam permissões de acesso às portas, para que o Command Service
+# invalide seu cache de permissões. A publicação acontece só depois do commit
+# (transaction.on_commit) e nunca bloqueia a requisição: o evento entra numa
+# fila limitada e uma thread de longa duração, com uma única conexão ao broker
+# (reconectando com backoff), o entrega.
+#
+# Com o RabbitMQ fora, os eventos esperam na fila. Se ela encher, os eventos
+# excedentes são descartados e o próximo envio é um 'access_reset', que
+# esvazia todo o cache do Command Service em vez de deixá-lo desatualizado
+# até o TTL.
+# -----------------------------------------------------------------------------
+import json
+import queue
+import threading
+import time
+from collections import Counter
+
+import pika
+from django.conf import settings
+from django.db import transaction
+
+EVENT_ACCESS_CHANGED = 'access_changed'
+EVENT_ACCESS_RESET = 'access_reset'
+
+
+class AccessEventPublisher:
+    """
+    Publicador persistente de eventos de acesso. `connect` devolve
+    (conexão, canal) já com o exchange declarado; é substituível nos testes.
+    """
+
+    def __init__(self, url, exchange, max_queue=1000, min_backoff=1, max_backoff=30, connect=None):
+        self.url = url
+        self.exchange = exchange
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stats = Counter()
+        self._connect = connect or self._open_channel
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lost = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, event_data):
+        """Enfileira um evento; nunca bloqueia."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event_data)
+        except queue.Full:
+            self._lost.set()
+            self.stats['dropped'] += 1
+            return False
+        self.stats['enqueued'] += 1
+        return True
+
+    def _ensure_started(self):
+        # Iniciada sob demanda: threads não sobrevivem ao fork dos workers do servidor.
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='access-events', daemon=True)
+                self._thread.start()
+
+    def _open_channel(self):
+        params = pika.URLParameters(self.url)
+        params.connection_attempts = 1
+        params.socket_timeout = 5
+        connection = pika.BlockingConnection(params)
+        channel = connection.channel()
+        channel.exchange_declare(exchange=self.exchange, exchange_type='fanout', durable=True)
+        return connection, channel
+
+    def _next_event(self):
+        """Próximo evento a enviar, ou None se a fila ficou vazia por um tempo."""
+        if self._lost.is_set():
+            # Houve descarte: os eventos na fila ficam cobertos por um reset completo.
+            self._lost.clear()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            return {'event_type': EVENT_ACCESS_RESET}
+        try:
+            return self._queue.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        connection = channel = event = None
+        backoff = self.min_backoff
+        while True:
+            try:
+                if channel is None:
+                    connection, channel = self._connect()
+                    self.stats['connects'] += 1
+                    backoff = self.min_backoff
+                if event is None:
+                    event = self._next_event()
+                if event is None:
+                    connection.process_data_events(0)  # mantém os heartbeats em dia
+                    continue
+                channel.basic_publish(exchange=self.exchange, routing_key='', body=json.dumps(event))
+                self.stats['published'] += 1
+                event = None
+            except (pika.exceptions.AMQPError, OSError) as e:
+                # O evento em mãos é mantido e reenviado após a reconexão.
+                print(f"ERRO: Falha ao publicar eventos de acesso ({e}); reconectando em {backoff} s.")
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except (pika.exceptions.AMQPError, OSError):
+                        pass
+                connection = channel = None
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = AccessEventPublisher(settings.RABBITMQ_URL, settings.ACCESS_EVENTS_EXCHANGE)
+        return _publisher
+
+
+def publish_access_event(event_data):
+    """Entrega um evento de acesso ao publicador em segundo plano."""
+    if not settings.ACCESS_EVENTS_ENABLED:
+        return
+    if not get_publisher().publish(event_data):
+        print(f"ERRO: Fila de eventos de acesso cheia; o próximo envio será um {EVENT_ACCESS_RESET}.")
+
+
+def access_changed(room_ids=(), user_ids=(), macs=()):
+    """Agenda, para depois do commit, o aviso de que essas salas/usuários/dispositivos mudaram."""
+    event_data = {
+        'event_type': EVENT_ACCESS_CHANGED,
+        'room_ids': sorted(set(room_ids)),
+        'user_ids': sorted(set(user_ids)),
+        'macs': sorted(set(macs)),
+    }
+    if event_data['room_ids'] or event_data['user_ids'] or event_data['macs']:
+        transaction.on_commit(lambda: publish_access_event(event_data))
+
+
+def access_reset():
+    """Agenda o aviso de que todo o índice de acesso foi reconstruído (o cache deve ser esvaziado)."""
+    transaction.on_commit(lambda: publish_access_event({'event_type': EVENT_ACCESS_RESET}))
@@ -0,0 +1,65 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/fieldsets.py
+# DESCRIÇÃO: Seleção de campos nas respostas de leitura via query string:
+#   ?fields=id,code,name,status   -> só esses campos
+#   ?expand=department,users      -> relações que vêm como objetos aninhados
+#
+# Sem nenhum dos dois, a resposta é a completa de sempre (tudo aninhado). Com
+# qualquer um deles, as relações pedidas em 'fields' mas não em 'expand' vêm
+# só com as chaves primárias. As views usam a mesma seleção para carregar do
+# banco apenas as relações que serão serializadas.
+# -----------------------------------------------------------------------------
+from rest_framework import serializers
+
+
+def _names(value):
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class FieldSelection:
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields  # None = todos os campos
+        self.expand = expand  # None = sem seleção (tudo expandido)
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method != 'GET':
+            return cls()
+        return cls(_names(request.query_params.get('fields')), _names(request.query_params.get('expand')))
+
+    @property
+    def sparse(self):
+        return self.fields is not None or self.expand is not None
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        """A relação `name` vai aninhada na resposta?"""
+        return self.includes(name) and (not self.sparse or name in (self.expand or ()))
+
+
+class SparseFieldsMixin:
+    """
+    Mixin de serializer que aplica a FieldSelection da requisição do contexto.
+    Só age no serializer raiz: serializers aninhados são declarados sem
+    contexto e mantêm todos os seus campos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selection = FieldSelection.from_request(self.context.get('request'))
+        if not selection.sparse:
+            return
+        unknown = (selection.fields or set()) | (selection.expand or set())
+        unknown -= set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Campos desconhecidos: {', '.join(sorted(unknown))}."})
+        for name, field in list(self.fields.items()):
+            if not selection.includes(name):
+                self.fields.pop(name)
+            elif isinstance(field, serializers.BaseSerializer) and not selection.expands(name):
+                many = isinstance(field, serializers.ListSerializer)
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many)
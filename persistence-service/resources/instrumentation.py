@@ -0,0 +1,83 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/instrumentation.py
+# DESCRIÇÃO: Métricas das verificações de permissão (HasRole): histograma de
+# latência e contadores de permitido/negado/erro por view, em memória do
+# processo (GET internal/permission-stats/).
+#
+# Para depuração, uma fração das verificações (PERMISSION_TRACE_SAMPLE_RATE,
+# 0 = desligado) é registrada em uma linha JSON no stdout, com view, papel,
+# papéis aceitos, resultado e latência. Headers e tokens nunca são impressos.
+# -----------------------------------------------------------------------------
+import bisect
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+
+# Limites superiores dos baldes do histograma, em milissegundos.
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+OUTCOMES = ('allowed', 'denied', 'error')
+
+
+class ViewStats:
+    def __init__(self):
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # o último é +Inf
+        self.total_ms = 0.0
+
+    def add(self, outcome, latency_ms):
+        self.outcomes[outcome] += 1
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.total_ms += latency_ms
+
+    def snapshot(self):
+        count = sum(self.buckets)
+        cumulative, running = {}, 0
+        for bound, hits in zip((*LATENCY_BUCKETS_MS, '+Inf'), self.buckets):
+            running += hits
+            cumulative[str(bound)] = running
+        return {
+            **self.outcomes,
+            'latency_ms': {
+                'count': count,
+                'sum': round(self.total_ms, 3),
+                'mean': round(self.total_ms / count, 4) if count else None,
+                'buckets': cumulative,  # acumulado: verificações com latência <= limite
+            },
+        }
+
+
+_views = {}  # nome da view -> ViewStats
+_lock = threading.Lock()
+
+
+def record_permission_check(view_name, outcome, started, role=None, allowed_roles=()):
+    """Registra uma verificação iniciada em `started` (time.perf_counter)."""
+    latency_ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        stats = _views.get(view_name)
+        if stats is None:
+            stats = _views[view_name] = ViewStats()
+        stats.add(outcome, latency_ms)
+    rate = settings.PERMISSION_TRACE_SAMPLE_RATE
+    if rate > 0 and random.random() < rate:
+        print(json.dumps({
+            'event': 'permission_check',
+            'view': view_name,
+            'role': role,
+            'allowed_roles': list(allowed_roles),
+            'outcome': outcome,
+            'latency_ms': round(latency_ms, 3),
+        }, ensure_ascii=False))
+
+
+def permission_stats():
+    with _lock:
+        return {name: stats.snapshot() for name, stats in sorted(_views.items())}
+
+
+def reset():
+    with _lock:
+        _views.clear()
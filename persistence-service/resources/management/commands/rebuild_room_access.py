@@ -0,0 +1,20 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/management/commands/rebuild_room_access.py
+# DESCRIÇÃO: Reconstrói do zero o índice RoomAccess a partir das relações.
+# Use após cargas em massa ou alterações que não disparam sinais.
+#   python manage.py rebuild_room_access
+# -----------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+
+from resources import access
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice de acesso às salas (RoomAccess)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Salas processadas por lote.")
+
+    def handle(self, *args, **options):
+        total = access.rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Índice de acesso reconstruído: {total} linhas."))
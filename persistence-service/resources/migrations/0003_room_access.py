@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_room_access(apps, schema_editor):
+    """Preenche o índice a partir das relações existentes (mesma regra de resources/access.py)."""
+    Room = apps.get_model('resources', 'Room')
+    RoomAccess = apps.get_model('resources', 'RoomAccess')
+    sources = [
+        (Room.admins.through.objects.values_list('room_id', 'admin__user_id'), 'administrador'),
+        (Room.users.through.objects.values_list('room_id', 'common__user_id'), 'usuario'),
+        (Room.special_coordinators.through.objects.values_list('room_id', 'coordinator__user_id'), 'coordenador_especial'),
+        (Room.objects.filter(department__coordinators__isnull=False)
+         .values_list('pk', 'department__coordinators__user_id'), 'coordenador_departamento'),
+    ]
+    RoomAccess.objects.bulk_create(
+        [RoomAccess(user_id=user_id, room_id=room_id, via=via) for queryset, via in sources for room_id, user_id in queryset],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0002_delete_log_room_special_coordinators_room_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField()),
+                ('via', models.CharField(choices=[('administrador', 'Administrador'), ('usuario', 'Usuario'), ('coordenador_departamento', 'Coordenador Departamento'), ('coordenador_especial', 'Coordenador Especial')], max_length=30)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accesses', to='resources.room')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'room', 'via'), name='uq_room_access_user_room_via')],
+            },
+        ),
+        migrations.RunPython(populate_room_access, migrations.RunPython.noop),
+    ]
@@ -49,5 +49,32 @@ class IOTObject(models.Model):
     def __str__(self):
         return f'{self.mac} - {self.description}'
 
+class RoomAccess(models.Model):
+    """
+    Índice desnormalizado de "quem acessa qual sala" (user_id, sala, via).
+    Derivado de Room.admins, Room.users, Room.special_coordinators e
+    Department.coordinators; mantido pelos sinais de resources/signals.py e
+    reconstruível com `python manage.py rebuild_room_access`.
+    Não edite diretamente.
+    """
+    class ViaChoices(models.TextChoices):
+        ADMINISTRADOR = 'administrador'
+        USUARIO = 'usuario'
+        COORDENADOR_DEPARTAMENTO = 'coordenador_departamento'
+        COORDENADOR_ESPECIAL = 'coordenador_especial'
+
+    user_id = models.IntegerField() # ID do usuário vindo do Auth Service
+    room = models.ForeignKey(Room, related_name='accesses', on_delete=models.CASCADE)
+    via = models.CharField(max_length=30, choices=ViaChoices.choices)
+
+    class Meta:
+        # A chave única começa por user_id: "minhas salas" é uma busca no índice.
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'room', 'via'], name='uq_room_access_user_room_via'),
+        ]
+
+    def __str__(self):
+        return f'Usuário {self.user_id} -> sala {self.room_id} ({self.via})'
+
 # O modelo Log não precisa estar aqui, ele pertence ao log-service.
 # Removi para manter a separação de responsabilidades.
\ No newline at end of file
@@ -0,0 +1,24 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/pagination.py
+# DESCRIÇÃO: Paginação por cursor das listagens, opcional. Sem os parâmetros
+# 'cursor' ou 'page_size' a resposta continua sendo a lista completa (formato
+# usado pelos clientes atuais); com eles, vem {'next', 'previous', 'results'}.
+#
+# O cursor é a posição na ordenação por 'id' (índice da chave primária), então
+# cada página custa o mesmo não importa quão longe se esteja na listagem, e
+# inserções entre uma página e outra não repetem nem pulam itens.
+# -----------------------------------------------------------------------------
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
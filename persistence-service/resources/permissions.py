@@ -2,6 +2,9 @@
 # ARQUIVO: resources/permissions.py (NOVO ARQUIVO!)
 # DESCRIÇÃO: Permissões customizadas baseadas em headers HTTP.
 # -----------------------------------------------------------------------------
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission
 from profiles.models import ActorUser
 
@@ -25,4 +28,16 @@ class IsResourceOwnerOrAdmin(BasePermission):
     def has_object_permission(self, request, view, obj):
         # Lógica para verificar se o request.headers.get('X-User-ID')
         # tem permissão sobre o objeto 'obj'.
-        return True # Simplificado por enquanto
\ No newline at end of file
+        return True # Simplificado por enquanto
+
+class IsInternalService(BasePermission):
+    """
+    Endpoints internos (chamados por outros serviços, não pelo front-end).
+    Exige o header X-Internal-Token igual a settings.INTERNAL_API_TOKEN.
+    Sem o segredo configurado, todo acesso é negado.
+    """
+    def has_permission(self, request, view):
+        expected = settings.INTERNAL_API_TOKEN
+        if not expected:
+            return False
+        return hmac.compare_digest(request.headers.get('X-Internal-Token', ''), expected)
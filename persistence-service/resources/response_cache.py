@@ -0,0 +1,148 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/response_cache.py
+# DESCRIÇÃO: Cache das respostas de listagem (salas e departamentos) no cache
+# do Django, invalidado por versão.
+#
+# Cada grupo de dados ('rooms', 'departments') tem um contador de versão no
+# próprio cache. A chave de uma resposta inclui as versões dos grupos de que
+# ela depende; qualquer escrita relevante incrementa a versão (após o commit,
+# pelos sinais de resources/signals.py) e as respostas antigas simplesmente
+# deixam de ser lidas até expirarem. Um contador ausente (cache reiniciado ou
+# entrada despejada) recomeça do relógio atual, sempre acima de qualquer
+# valor usado antes, então uma chave antiga nunca volta a valer.
+#
+# As mesmas versões geram o ETag das leituras (GET condicional): um
+# If-None-Match igual ao atual é respondido com 304 sem consultar o banco.
+#
+# As versões só valem se todos os processos enxergam o mesmo cache: por isso
+# RESPONSE_CACHE_ENABLED exige um Redis compartilhado (ver settings.py) e, com
+# ele desligado, as leituras não usam versões nem ETag.
+#
+# Os contadores de acertos/falhas/304 são do processo (GET internal/cache-stats/).
+# -----------------------------------------------------------------------------
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+ROOMS = 'rooms'
+DEPARTMENTS = 'departments'
+
+_stats = defaultdict(Counter)  # endpoint -> {'hits', 'misses'}
+_bumps = Counter()  # grupo -> versões incrementadas por este processo
+_lock = threading.Lock()
+
+
+def enabled():
+    return settings.RESPONSE_CACHE_ENABLED
+
+
+def _version_key(group):
+    return f'version:{group}'
+
+
+def _changed_key(group):
+    return f'changed:{group}'
+
+
+def state(groups):
+    """
+    Versões atuais dos grupos e o instante (epoch) da última mudança entre
+    eles, numa única leitura do cache. Grupos sem contador são criados agora.
+    """
+    keys = [key for group in groups for key in (_version_key(group), _changed_key(group))]
+    current = cache.get_many(keys)
+    for group in groups:
+        if _version_key(group) not in current:
+            now = time.time()
+            cache.add(_version_key(group), time.time_ns(), timeout=None)
+            cache.add(_changed_key(group), now, timeout=None)
+            current.update(cache.get_many([_version_key(group), _changed_key(group)]))
+    versions = tuple(current[_version_key(group)] for group in groups)
+    changed = max(current.get(_changed_key(group)) or time.time() for group in groups)
+    return versions, changed
+
+
+def bump(*groups):
+    """Invalida as respostas que dependem dos grupos informados."""
+    for group in groups:
+        key = _version_key(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+        cache.set(_changed_key(group), time.time(), timeout=None)
+        with _lock:
+            _bumps[group] += 1
+
+
+def bump_on_commit(*groups):
+    # Incrementar antes do commit deixaria uma leitura concorrente guardar
+    # os dados antigos sob a versão nova.
+    transaction.on_commit(lambda: bump(*groups))
+
+
+def fingerprint(request, versions, user_id=None):
+    """
+    Identifica uma representação: caminho, query string, host (usado nos
+    links de paginação), usuário e versões dos dados. Base do ETag e da chave
+    no cache de respostas.
+    """
+    params = sorted((name, tuple(values)) for name, values in request.query_params.lists())
+    raw = repr((request.path, request.get_host(), params, user_id, versions))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def etag(digest):
+    return f'W/"{digest[:24]}"'
+
+
+def etag_matches(header, current):
+    """Comparação fraca do If-None-Match (lista de ETags ou '*')."""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    plain = current.removeprefix('W/')
+    return '*' in tags or any(tag.removeprefix('W/') == plain for tag in tags)
+
+
+def response_key(endpoint, digest):
+    return f'response:{endpoint}:{digest}'
+
+
+def record(endpoint, event):
+    with _lock:
+        _stats[endpoint][event] += 1
+
+
+def get(endpoint, key):
+    data = cache.get(key)
+    record(endpoint, 'hits' if data is not None else 'misses')
+    return data
+
+
+def set(key, data):
+    cache.set(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def stats():
+    with _lock:
+        endpoints = {endpoint: dict(counter) for endpoint, counter in _stats.items()}
+        bumps = dict(_bumps)
+    hits = sum(counter.get('hits', 0) for counter in endpoints.values())
+    misses = sum(counter.get('misses', 0) for counter in endpoints.values())
+    not_modified = sum(counter.get('not_modified', 0) for counter in endpoints.values())
+    return {
+        'enabled': enabled(),
+        'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'not_modified': not_modified,
+        'endpoints': endpoints,
+        'version_bumps': bumps,
+    }
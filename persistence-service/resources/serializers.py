@@ -4,6 +4,7 @@
 from rest_framework import serializers
 from .models import Department, Room, IOTObject
 from profiles.models import Coordinator, Admin, Common
+from .fieldsets import SparseFieldsMixin
 
 # --- Serializers para LEITURA (Read) ---
 
@@ -22,7 +23,7 @@ class CommonProfileSerializer(serializers.ModelSerializer):
         model = Common
         fields = ['user_id']
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     coordinators = CoordinatorProfileSerializer(many=True, read_only=True)
     class Meta:
         model = Department
@@ -33,7 +34,7 @@ class IOTObjectSerializer(serializers.ModelSerializer):
         model = IOTObject
         fields = ['id', 'mac', 'status', 'description']
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     admins = AdminProfileSerializer(many=True, read_only=True)
     users = CommonProfileSerializer(many=True, read_only=True)
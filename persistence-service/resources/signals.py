@@ -0,0 +1,149 @@
+# -----------------------------------------------------------------------------
+# ARQUIVO: resources/signals.py
+# DESCRIÇÃO: Mantém o índice RoomAccess em dia a cada mudança nas relações de
+# acesso (admins, usuários e coordenadores especiais das salas, coordenadores
+# dos departamentos, departamento de uma sala e remoção de perfis), avisa o
+# Command Service quando um dispositivo muda de sala ou de MAC e invalida o
+# cache de respostas das listagens (resources/response_cache.py).
+# Registrado em ResourcesConfig.ready().
+#
+# Operações que não disparam sinais (queryset.update, bulk_create na tabela
+# intermediária, SQL direto) exigem `python manage.py rebuild_room_access`
+# (que também invalida o cache de respostas).
+# -----------------------------------------------------------------------------
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from profiles.models import Admin, Common, Coordinator
+from . import access, events, response_cache
+from .models import Department, IOTObject, Room, RoomAccess
+
+Via = RoomAccess.ViaChoices
+
+# Relações M2M de Room que concedem acesso, e o related_name do lado do perfil.
+ROOM_RELATIONS = {
+    Room.admins.through: 'rooms_administered',
+    Room.users.through: 'rooms_accessed',
+    Room.special_coordinators.through: 'special_rooms_coordinated',
+}
+
+
+def _affected_ids(instance, reverse, pk_set, related_name):
+    """
+    Ids dos objetos do lado "dono" da relação (salas ou departamentos) tocados
+    por um m2m_changed. No lado reverso, pk_set já são esses ids; num clear
+    reverso, pk_set vem vazio e os ids são lidos no pre_clear.
+    """
+    if not reverse:
+        return [instance.pk]
+    if pk_set:
+        return list(pk_set)
+    return list(getattr(instance, related_name).values_list('pk', flat=True))
+
+
+def room_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    related_name = ROOM_RELATIONS[sender]
+    if action == 'pre_clear':
+        # Depois do clear não há mais como saber quais salas eram afetadas.
+        instance._room_access_pending = _affected_ids(instance, reverse, pk_set, related_name)
+    elif action == 'post_clear':
+        access.refresh_rooms(getattr(instance, '_room_access_pending', []))
+    elif action in ('post_add', 'post_remove'):
+        access.refresh_rooms(_affected_ids(instance, reverse, pk_set, related_name))
+
+
+for through in ROOM_RELATIONS:
+    m2m_changed.connect(room_relation_changed, sender=through, dispatch_uid=f'room_access_{through.__name__}')
+
+
+@receiver(m2m_changed, sender=Department.coordinators.through, dispatch_uid='room_access_department_coordinators')
+def department_coordinators_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._room_access_pending = _affected_ids(instance, reverse, pk_set, 'departments')
+    elif action == 'post_clear':
+        access.refresh_departments(getattr(instance, '_room_access_pending', []))
+    elif action in ('post_add', 'post_remove'):
+        access.refresh_departments(_affected_ids(instance, reverse, pk_set, 'departments'))
+
+
+@receiver(pre_save, sender=Room, dispatch_uid='room_access_room_pre_save')
+def room_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Guarda o departamento anterior para saber, no post_save, se ele mudou.
+    if instance.pk and (update_fields is None or 'department' in update_fields):
+        instance._previous_department_id = (
+            Room.objects.filter(pk=instance.pk).values_list('department_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Room, dispatch_uid='room_access_room_post_save')
+def room_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_department_id', None)
+    if created or (previous is not None and previous != instance.department_id):
+        access.refresh_rooms([instance.pk])
+
+
+# Remover um perfil apaga as linhas da tabela intermediária em cascata, sem m2m_changed.
+PROFILE_VIAS = {
+    Admin: [Via.ADMINISTRADOR],
+    Common: [Via.USUARIO],
+    Coordinator: [Via.COORDENADOR_DEPARTAMENTO, Via.COORDENADOR_ESPECIAL],
+}
+
+
+def profile_deleted(sender, instance, **kwargs):
+    RoomAccess.objects.filter(user_id=instance.user_id, via__in=PROFILE_VIAS[sender]).delete()
+    events.access_changed(user_ids=[instance.user_id])
+
+
+for profile in PROFILE_VIAS:
+    post_delete.connect(profile_deleted, sender=profile, dispatch_uid=f'room_access_delete_{profile.__name__}')
+
+
+# Dispositivos: o cache de permissões é por (usuário, MAC), então criar,
+# mover ou remover um dispositivo invalida as entradas do MAC.
+@receiver(pre_save, sender=IOTObject, dispatch_uid='room_access_iot_pre_save')
+def iot_object_pre_save(sender, instance, **kwargs):
+    instance._previous_placement = (
+        IOTObject.objects.filter(pk=instance.pk).values_list('mac', 'room_id').first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=IOTObject, dispatch_uid='room_access_iot_post_save')
+def iot_object_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_placement', None)
+    if created or previous != (instance.mac, instance.room_id):
+        events.access_changed(macs=[instance.mac] + ([previous[0]] if previous else []))
+
+
+@receiver(post_delete, sender=IOTObject, dispatch_uid='room_access_iot_post_delete')
+def iot_object_post_delete(sender, instance, **kwargs):
+    events.access_changed(macs=[instance.mac])
+
+
+# Cache de respostas: toda escrita que muda o conteúdo das listagens. O
+# departamento e seus coordenadores aparecem aninhados nas salas.
+RESPONSE_GROUPS = {
+    Room: [response_cache.ROOMS],
+    IOTObject: [response_cache.ROOMS],
+    Department: [response_cache.ROOMS, response_cache.DEPARTMENTS],
+    Admin: [response_cache.ROOMS],
+    Common: [response_cache.ROOMS],
+    Coordinator: [response_cache.ROOMS, response_cache.DEPARTMENTS],
+    Room.admins.through: [response_cache.ROOMS],
+    Room.users.through: [response_cache.ROOMS],
+    Room.special_coordinators.through: [response_cache.ROOMS],
+    Department.coordinators.through: [response_cache.ROOMS, response_cache.DEPARTMENTS],
+}
+
+
+def invalidate_responses(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        response_cache.bump_on_commit(*RESPONSE_GROUPS[sender])
+
+
+for model in (Room, IOTObject, Department):
+    post_save.connect(invalidate_responses, sender=model, dispatch_uid=f'response_cache_save_{model.__name__}')
+for model in (Room, IOTObject, Department, Admin, Common, Coordinator):
+    post_delete.connect(invalidate_responses, sender=model, dispatch_uid=f'response_cache_delete_{model.__name__}')
+for through in (*ROOM_RELATIONS, Department.coordinators.through):
+    m2m_changed.connect(invalidate_responses, sender=through, dispatch_uid=f'response_cache_m2m_{through.__name__}')
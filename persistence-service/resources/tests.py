@@ -1,3 +1,493 @@
-from django.test import TestCase
+import io
+import json
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from persistence_project import utils
+from profiles.models import Admin, Common, Coordinator
+from . import events, instrumentation, response_cache
+from .models import Department, Room, IOTObject, RoomAccess
+
+
+def make_token(user_id, role):
+    """Token igual ao emitido pelo Auth Service (lido do cookie 'access_token')."""
+    return jwt.encode({'user_id': user_id, 'role': role}, settings.SECRET_KEY, algorithm='HS256')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, ACCESS_EVENTS_ENABLED=False)
+class RoomFixtures(TestCase):
+    """
+    Salas, departamentos e perfis compartilhados pelos testes de leitura.
+    O cache de respostas fica desligado: estes testes medem o trabalho da view.
+    """
+    ROOMS = 12
+
+    # Salas: 1 (salas + departamento) + 5 prefetches (coordenadores do
+    # departamento, admins, usuários, coordenadores especiais, objetos IoT).
+    # Departamentos: 1 + 1 prefetch (coordenadores).
+    BUDGETS = [
+        ('room-list-create', {}, 6),
+        ('list_all_rooms', {}, 6),
+        ('list_my_rooms', {}, 6),
+        ('list-available-rooms', {}, 6),
+        ('room-detail', {'pk': 'room'}, 6),
+        ('department-list-create', {}, 2),
+        ('department-detail', {'pk': 'department'}, 2),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        coordinators = [Coordinator.objects.create(user_id=100 + i) for i in range(3)]
+        admins = [Admin.objects.create(user_id=200 + i) for i in range(3)]
+        users = [Common.objects.create(user_id=300 + i) for i in range(5)]
+        cls.departments = []
+        for d in range(3):
+            department = Department.objects.create(name=f'Departamento {d}', code=f'D{d}')
+            department.coordinators.set(coordinators[: d + 1])
+            cls.departments.append(department)
+        for r in range(cls.ROOMS):
+            room = Room.objects.create(code=f'S{r}', name=f'Sala {r}', department=cls.departments[r % 3])
+            room.admins.set(admins[: r % 3 + 1])
+            room.users.set(users)
+            room.special_coordinators.set(coordinators[r % 2:])
+            for k in range(2):
+                IOTObject.objects.create(mac=f'aa:bb:cc:dd:{r:02x}:{k:02x}', room=room)
+        cls.room = Room.objects.first()
+        cls.department = cls.departments[0]
+
+    def setUp(self):
+        # O usuário 300 é 'padrao' em todas as salas (rooms/my-access/ devolve todas).
+        self.client.cookies['access_token'] = make_token(300, 'administrador')
+
+
+class QueryBudgetTests(RoomFixtures):
+    """
+    Orçamento fixo de consultas por endpoint de leitura. Se um serializer
+    passar a ler uma relação que a view não carrega antecipadamente, o número
+    de consultas passa a crescer com a quantidade de salas e o teste falha.
+    """
+
+    def _url(self, name, kwargs):
+        resolved = {key: getattr(self, value).pk for key, value in kwargs.items()}
+        return reverse(name, kwargs=resolved or None)
+
+    def test_read_endpoints_stay_within_query_budget(self):
+        for name, kwargs, budget in self.BUDGETS:
+            with self.subTest(endpoint=name):
+                url = self._url(name, kwargs)
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, response.content)
+
+    def test_room_list_query_count_does_not_grow_with_rooms(self):
+        url = reverse('list_all_rooms')
+        with self.assertNumQueries(6):
+            before = len(self.client.get(url).json())
+        extra = Room.objects.create(code='EXTRA', name='Extra', department=self.department)
+        extra.users.set(Common.objects.all())
+        IOTObject.objects.create(mac='aa:bb:cc:dd:ff:ff', room=extra)
+        with self.assertNumQueries(6):
+            after = len(self.client.get(url).json())
+        self.assertEqual(after, before + 1)
+
+    def test_room_payload_includes_nested_relations(self):
+        rooms = self.client.get(reverse('list_all_rooms')).json()
+        self.assertEqual(len(rooms), self.ROOMS)
+        room = next(room for room in rooms if room['code'] == 'S0')
+        self.assertEqual(len(room['iot_objects']), 2)
+        self.assertEqual(len(room['users']), 5)
+        self.assertEqual(len(room['department']['coordinators']), 1)
+
+
+class SparseFieldsAndPaginationTests(RoomFixtures):
+    def test_fields_only_loads_requested_columns(self):
+        with self.assertNumQueries(1):
+            rooms = self.client.get(reverse('list_all_rooms'), {'fields': 'id,code,name,status'}).json()
+        self.assertEqual(len(rooms), self.ROOMS)
+        self.assertEqual(set(rooms[0]), {'id', 'code', 'name', 'status'})
+
+    def test_relations_are_ids_unless_expanded(self):
+        url = reverse('list_all_rooms')
+        with self.assertNumQueries(2):
+            rooms = self.client.get(url, {'fields': 'code,department,users'}).json()
+        room = next(room for room in rooms if room['code'] == 'S0')
+        self.assertEqual(room['department'], self.departments[0].pk)
+        self.assertEqual(sorted(room['users']), sorted(Common.objects.values_list('pk', flat=True)))
+
+        with self.assertNumQueries(2):
+            rooms = self.client.get(url, {'fields': 'code,department', 'expand': 'department'}).json()
+        self.assertEqual(rooms[0]['department']['code'], 'D0')
+
+    def test_reverse_relation_ids_do_not_query_per_object(self):
+        with self.assertNumQueries(2):
+            rooms = self.client.get(reverse('list_all_rooms'), {'fields': 'code,iot_objects'}).json()
+        self.assertEqual(len(rooms), self.ROOMS)
+        room = next(room for room in rooms if room['code'] == 'S0')
+        self.assertEqual(
+            sorted(room['iot_objects']), sorted(IOTObject.objects.filter(room__code='S0').values_list('pk', flat=True)),
+        )
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('list_all_rooms'), {'fields': 'id,senha'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination_is_opt_in(self):
+        url = reverse('list_all_rooms')
+        self.assertIsInstance(self.client.get(url).json(), list)
+
+        codes, params = [], {'page_size': 5, 'fields': 'code'}
+        page = self.client.get(url, params).json()
+        while True:
+            self.assertLessEqual(len(page['results']), 5)
+            codes += [room['code'] for room in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).json()
+        self.assertEqual(codes, list(Room.objects.order_by('id').values_list('code', flat=True)))
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(RoomFixtures):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_repeated_listing_is_served_from_cache(self):
+        url = reverse('list-available-rooms')
+        first = self.client.get(url).json()
+        with self.assertNumQueries(0):
+            second = self.client.get(url).json()
+        self.assertEqual(first, second)
+        # Query strings diferentes são respostas diferentes.
+        with self.assertNumQueries(1):
+            self.client.get(url, {'fields': 'id'})
+        self.assertGreaterEqual(response_cache.stats()['endpoints']['list-available-rooms']['hits'], 1)
+
+    def test_writes_invalidate_after_commit(self):
+        url = reverse('list_all_rooms')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.create(code='NOVA', name='Nova', department=self.department)
+        codes = [room['code'] for room in self.client.get(url).json()]
+        self.assertIn('NOVA', codes)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.department.coordinators.clear()
+        rooms = self.client.get(url).json()
+        self.assertEqual(rooms[0]['department']['coordinators'], [])
+
+    def test_my_access_is_cached_per_user(self):
+        url = reverse('list_my_rooms')
+        self.assertEqual(len(self.client.get(url).json()), self.ROOMS)
+        self.client.cookies['access_token'] = make_token(999, 'padrao')
+        self.assertEqual(self.client.get(url).json(), [])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ConditionalGetTests(RoomFixtures):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_matching_etag_returns_304_without_queries(self):
+        for name, kwargs in [('list_all_rooms', {}), ('room-detail', {'pk': self.room.pk}),
+                             ('department-list-create', {}), ('department-detail', {'pk': self.department.pk})]:
+            with self.subTest(endpoint=name):
+                url = reverse(name, kwargs=kwargs or None)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                with self.assertNumQueries(0):
+                    again = self.client.get(url, headers={'If-None-Match': response['ETag']})
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again['ETag'], response['ETag'])
+                self.assertEqual(again.content, b'')
+
+    def test_etag_changes_with_writes_and_representation(self):
+        url = reverse('list_all_rooms')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'fields': 'id'})['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.users.clear()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_no_etag_without_shared_cache(self):
+        url = reverse('list_all_rooms')
+        etag = self.client.get(url)['ETag']
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_per_user_etag_varies_on_cookie(self):
+        url = reverse('list_my_rooms')
+        response = self.client.get(url)
+        self.assertIn('Cookie', response['Vary'])
+        self.client.cookies['access_token'] = make_token(999, 'padrao')
+        other = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(other.status_code, 200)
+
+
+class TokenClaimsCacheTests(RoomFixtures):
+    def setUp(self):
+        super().setUp()
+        utils._claims_cache.clear()
+
+    def test_token_is_verified_once(self):
+        url = reverse('list_my_rooms')
+        with mock.patch('persistence_project.utils.jwt.decode', wraps=jwt.decode) as decode:
+            self.client.get(url)  # view + get_queryset: um decode pelo memo da requisição
+            self.assertEqual(decode.call_count, 1)
+            self.client.get(url)  # outra requisição: vem do LRU
+            self.assertEqual(decode.call_count, 1)
+
+    def test_cached_claims_respect_exp(self):
+        exp = int(time.time()) + 60
+        token = jwt.encode({'user_id': 1, 'role': 'padrao', 'exp': exp}, settings.SECRET_KEY, algorithm='HS256')
+        self.assertEqual(utils.decode_token(token)['user_id'], 1)
+        with mock.patch('persistence_project.utils.time.time', return_value=exp):
+            # Entrada vencida: descartada e o token decodificado (e recusado) de novo.
+            with self.assertRaises(jwt.ExpiredSignatureError):
+                with mock.patch('jwt.api_jwt.datetime') as clock:
+                    clock.now.return_value = datetime.fromtimestamp(exp + 1, timezone.utc)
+                    utils.decode_token(token)
+        self.assertEqual(len(utils._claims_cache), 0)
+
+    @override_settings(JWT_CLAIMS_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        for user_id in range(5):
+            utils.decode_token(make_token(user_id, 'padrao'))
+        self.assertEqual(len(utils._claims_cache), 2)
+
+
+class PermissionInstrumentationTests(RoomFixtures):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+
+    def test_checks_are_counted_without_output(self):
+        url = reverse('list_all_rooms')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.client.get(url)
+            self.client.cookies['access_token'] = make_token(1, 'padrao')
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(output.getvalue(), '')
+        stats = instrumentation.permission_stats()['ListAllRoomsAPIView']
+        self.assertEqual((stats['allowed'], stats['denied']), (1, 1))
+        self.assertEqual(stats['latency_ms']['count'], 2)
+        self.assertEqual(stats['latency_ms']['buckets']['+Inf'], 2)
+
+    @override_settings(PERMISSION_TRACE_SAMPLE_RATE=1.0)
+    def test_sampled_trace_is_one_json_line_without_token(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.client.get(reverse('list_all_rooms'))
+        trace = json.loads(output.getvalue())
+        self.assertEqual(trace['outcome'], 'allowed')
+        self.assertEqual(trace['role'], 'administrador')
+        self.assertNotIn(self.client.cookies['access_token'].value, output.getvalue())
+
+
+class FakeAccessChannel:
+    """Conexão e canal em memória para o AccessEventPublisher."""
+
+    def __init__(self, failures=0):
+        self.failures = failures  # conexões recusadas antes da primeira que funciona
+        self.bodies = []
+        self.is_open = True
+
+    def connect(self):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('broker fora do ar')
+        return self, self
+
+    def basic_publish(self, exchange, routing_key, body):
+        self.bodies.append(json.loads(body))
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.bodies) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.bodies
+
+
+@override_settings(INTERNAL_API_TOKEN='segredo-interno', ACCESS_EVENTS_ENABLED=False)
+class CheckPermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name='Departamento', code='D')
+        cls.room = Room.objects.create(code='S1', name='Sala 1', department=department)
+        cls.room.users.add(Common.objects.create(user_id=10))
+        IOTObject.objects.create(mac='aa:bb:cc:dd:ee:01', room=cls.room)
+
+    def check(self, user_id, mac, token='segredo-interno'):
+        return self.client.get(
+            reverse('internal-check-permission'),
+            {'user_id': user_id, 'mac_address': mac},
+            headers={'X-Internal-Token': token},
+        )
+
+    def test_single_query_per_check(self):
+        with self.assertNumQueries(1):
+            response = self.check(10, 'aa:bb:cc:dd:ee:01')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'allowed': True, 'room_id': self.room.pk})
+
+    def test_denied_unknown_and_unauthorized(self):
+        self.assertEqual(self.check(11, 'aa:bb:cc:dd:ee:01').status_code, 403)
+        self.assertEqual(self.check(10, 'ff:ff:ff:ff:ff:ff').status_code, 404)
+        self.assertEqual(self.check(10, 'aa:bb:cc:dd:ee:01', token='errado').status_code, 403)
+        self.assertEqual(self.check('x', 'aa:bb:cc:dd:ee:01').status_code, 400)
+
+    @override_settings(INTERNAL_API_TOKEN='')
+    def test_internal_endpoints_closed_without_token(self):
+        self.assertEqual(self.check(10, 'aa:bb:cc:dd:ee:01', token='').status_code, 403)
+        self.assertEqual(self.client.get(reverse('internal-cache-stats')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('internal-permission-stats')).status_code, 403)
+
+    @override_settings(ACCESS_EVENTS_ENABLED=True)
+    def test_access_change_is_published_after_commit(self):
+        channel = FakeAccessChannel(failures=1)
+        publisher = events.AccessEventPublisher('amqp://', 'access_events', min_backoff=0.01, connect=channel.connect)
+        with mock.patch.object(events, '_publisher', publisher):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.room.users.add(Common.objects.create(user_id=11))
+            bodies = channel.wait_for(1)
+        # A primeira conexão falhou; o evento esperou na fila e saiu na reconexão.
+        self.assertEqual([body['room_ids'] for body in bodies], [[self.room.pk]])
+        self.assertEqual(self.check(11, 'aa:bb:cc:dd:ee:01').status_code, 200)
+
+    def test_overflow_is_replaced_by_reset(self):
+        channel = FakeAccessChannel(failures=1)
+        publisher = events.AccessEventPublisher(
+            'amqp://', 'access_events', max_queue=2, min_backoff=0.2, connect=channel.connect,
+        )
+        results = [publisher.publish({'event_type': events.EVENT_ACCESS_CHANGED, 'room_ids': [i]}) for i in range(5)]
+        self.assertIn(False, results)
+        bodies = channel.wait_for(1)
+        self.assertEqual(bodies[-1], {'event_type': events.EVENT_ACCESS_RESET})
+
+
+@override_settings(INTERNAL_API_TOKEN='segredo-interno', ACCESS_EVENTS_ENABLED=False, RESPONSE_CACHE_ENABLED=False)
+class RoomAccessRevocationTests(TestCase):
+    """
+    Cada caminho que revoga acesso precisa atualizar o índice RoomAccess: as
+    linhas da sala e a resposta de check-permission devem mudar juntas.
+    """
+    MAC = 'aa:bb:cc:dd:ee:10'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Departamento', code='D')
+        cls.other_department = Department.objects.create(name='Outro', code='O')
+        cls.room = Room.objects.create(code='S1', name='Sala 1', department=cls.department)
+        IOTObject.objects.create(mac=cls.MAC, room=cls.room)
+        cls.coordinator = Coordinator.objects.create(user_id=20)
+        cls.other_coordinator = Coordinator.objects.create(user_id=21)
+        cls.department.coordinators.add(cls.coordinator)
+        cls.other_department.coordinators.add(cls.other_coordinator)
+        cls.admin = Admin.objects.create(user_id=30)
+        cls.common = Common.objects.create(user_id=31)
+        cls.special = Coordinator.objects.create(user_id=32)
+
+    def assertAccess(self, user_id, allowed):
+        rows = RoomAccess.objects.filter(user_id=user_id, room=self.room).exists()
+        response = self.client.get(
+            reverse('internal-check-permission'),
+            {'user_id': user_id, 'mac_address': self.MAC},
+            headers={'X-Internal-Token': 'segredo-interno'},
+        )
+        self.assertEqual(rows, allowed)
+        self.assertEqual(response.status_code, 200 if allowed else 403)
+
+    def relations(self):
+        # (campo em Room, related_name no perfil, perfil)
+        return [
+            ('admins', 'rooms_administered', self.admin),
+            ('users', 'rooms_accessed', self.common),
+            ('special_coordinators', 'special_rooms_coordinated', self.special),
+        ]
+
+    def test_m2m_remove_and_clear_revoke_access(self):
+        revocations = {
+            'remove': lambda forward, reverse, profile: forward.remove(profile),
+            'clear': lambda forward, reverse, profile: forward.clear(),
+            'reverse remove': lambda forward, reverse, profile: reverse.remove(self.room),
+            'reverse clear': lambda forward, reverse, profile: reverse.clear(),
+        }
+        for field, related_name, profile in self.relations():
+            for label, revoke in revocations.items():
+                with self.subTest(field=field, revocation=label):
+                    forward, reverse = getattr(self.room, field), getattr(profile, related_name)
+                    forward.add(profile)
+                    self.assertAccess(profile.user_id, True)
+                    revoke(forward, reverse, profile)
+                    self.assertAccess(profile.user_id, False)
+
+    def test_department_coordinator_change(self):
+        self.assertAccess(self.coordinator.user_id, True)
+        self.department.coordinators.remove(self.coordinator)
+        self.assertAccess(self.coordinator.user_id, False)
+
+        self.department.coordinators.add(self.coordinator)
+        self.department.coordinators.clear()
+        self.assertAccess(self.coordinator.user_id, False)
+
+        self.coordinator.departments.add(self.department)
+        self.assertAccess(self.coordinator.user_id, True)
+        self.coordinator.departments.remove(self.department)
+        self.assertAccess(self.coordinator.user_id, False)
+
+        self.coordinator.departments.add(self.department)
+        self.coordinator.departments.clear()
+        self.assertAccess(self.coordinator.user_id, False)
+
+    def test_room_moved_to_another_department(self):
+        self.room.admins.add(self.admin)
+        self.assertAccess(self.coordinator.user_id, True)
+        self.assertAccess(self.other_coordinator.user_id, False)
+
+        self.room.department = self.other_department
+        self.room.save()
+
+        self.assertAccess(self.coordinator.user_id, False)
+        self.assertAccess(self.other_coordinator.user_id, True)
+        # As vias diretas da sala continuam valendo.
+        self.assertAccess(self.admin.user_id, True)
+
+    def test_profile_delete_revokes_access(self):
+        self.room.admins.add(self.admin)
+        self.room.users.add(self.common)
+        self.room.special_coordinators.add(self.special)
+        profiles = [self.admin, self.common, self.special, self.coordinator]
+        for profile in profiles:
+            self.assertAccess(profile.user_id, True)
+        for profile in profiles:
+            with self.subTest(profile=type(profile).__name__, user_id=profile.user_id):
+                profile.delete()
+                self.assertAccess(profile.user_id, False)
+
+    def test_coordinator_delete_revokes_both_vias(self):
+        # O mesmo coordenador pode acessar pelo departamento e como especial.
+        self.room.special_coordinators.add(self.coordinator)
+        self.assertEqual(
+            set(RoomAccess.objects.filter(user_id=self.coordinator.user_id).values_list('via', flat=True)),
+            {RoomAccess.ViaChoices.COORDENADOR_DEPARTAMENTO, RoomAccess.ViaChoices.COORDENADOR_ESPECIAL},
+        )
+        self.coordinator.delete()
+        self.assertAccess(self.coordinator.user_id, False)
@@ -5,7 +5,8 @@ from django.urls import path
 from .views import (
     ListAllRoomsAPIView, ListRoomsWithAccessAPIView, ListAvailableRoomsAPIView, # NOVO
     DepartmentListCreateAPIView, DepartmentRetrieveUpdateDestroyAPIView,
-    RoomListCreateAPIView, RoomRetrieveUpdateDestroyAPIView
+    RoomListCreateAPIView, RoomRetrieveUpdateDestroyAPIView,
+    CheckPermissionAPIView, CacheStatsAPIView, PermissionStatsAPIView,
 )
 
 urlpatterns = [
@@ -20,4 +21,9 @@ urlpatterns = [
     path('rooms/my-access/', ListRoomsWithAccessAPIView.as_view(), name='list_my_rooms'),
     # NOVO: Rota para as salas disponíveis.
     path('rooms/available/', ListAvailableRoomsAPIView.as_view(), name='list-available-rooms'),
+
+    # Rotas internas, chamadas diretamente pelos outros serviços.
+    path('internal/check-permission/', CheckPermissionAPIView.as_view(), name='internal-check-permission'),
+    path('internal/cache-stats/', CacheStatsAPIView.as_view(), name='internal-cache-stats'),
+    path('internal/permission-stats/', PermissionStatsAPIView.as_view(), name='internal-permission-stats'),
 ]
\ No newline at end of file
@@ -1,14 +1,24 @@
 # -----------------------------------------------------------------------------
 # ARQUIVO: persistence-service/resources/views.py (VERSÃO FINAL E CORRIGIDA)
 # -----------------------------------------------------------------------------
-from rest_framework import generics, permissions
+import time
+
+from rest_framework import generics, permissions, status
 from rest_framework.permissions import BasePermission
-from django.db.models import Q
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
 
 from persistence_project.utils import get_user_info_from_token
 
 
-from .models import Room, Department
+from . import instrumentation, response_cache
+from .access import rooms_for_user
+from .fieldsets import FieldSelection
+from .models import Room, Department, IOTObject, RoomAccess
+from .permissions import IsInternalService
 from .serializers import (
     RoomSerializer, DepartmentSerializer,
     DepartmentCreateUpdateSerializer, RoomCreateUpdateSerializer
@@ -18,41 +28,141 @@ from .serializers import (
 class HasRole(permissions.BasePermission):
     """
     Permissão customizada que verifica o papel do usuário a partir do token.
+    Cada verificação alimenta as métricas de resources/instrumentation.py.
     """
-    allowed_roles = []
 
     def has_permission(self, request, view):
-        # MUDANÇA: Adicionamos um print para ver TODOS os headers
-        print("--- 🕵️ Depurando Permissão HasRole (Etapa Final) 🕵️ ---")
-        print(f"HEADERS COMPLETOS RECEBIDOS PELO SERVIÇO:\n{request.headers}")
-        
-        self.allowed_roles = getattr(view, 'allowed_roles', [])
-        print(f"✔️ Roles permitidos para esta view: {self.allowed_roles}")
+        started = time.perf_counter()
+        allowed_roles = getattr(view, 'allowed_roles', [])
+        user_role, outcome = None, 'error'
+        try:
+            # Token ausente nega; token inválido levanta AuthenticationFailed.
+            user_info = get_user_info_from_token(request)
+            user_role = user_info.get('role') if user_info else None
+            is_allowed = user_role in allowed_roles
+            outcome = 'allowed' if is_allowed else 'denied'
+            return is_allowed
+        finally:
+            instrumentation.record_permission_check(
+                view.__class__.__name__, outcome, started, role=user_role, allowed_roles=allowed_roles,
+            )
 
-        user_info = get_user_info_from_token(request)
-        if not user_info:
-            print("❌ ERRO: Token não encontrado ou inválido na função get_user_info_from_token.")
-            # Este print agora é redundante se o de cima funcionar, mas vamos manter por enquanto.
-            return False
-            
-        user_role = user_info.get('role')
-        print(f"✔️ Role encontrado no token: '{user_role}' (Tipo: {type(user_role)})")
-        
-        is_allowed = user_role in self.allowed_roles
-        print(f"👉 O usuário tem permissão? {is_allowed}")
-        print("------------------------------------------")
-        
-        return is_allowed
-# --- Views de LEITURA ---
+# --- Querysets de leitura ---
 
-class ListAllRoomsAPIView(generics.ListAPIView):
+ROOM_M2M_RELATIONS = ('admins', 'users', 'special_coordinators', 'iot_objects')
+
+
+def room_read_queryset(selection=None):
+    """
+    Tudo o que o RoomSerializer lê (departamento e seus coordenadores, admins,
+    usuários, coordenadores especiais e objetos IoT) em um número fixo de
+    consultas, qualquer que seja a quantidade de salas. Com ?fields=/?expand=,
+    só as relações pedidas são carregadas; as que vão só como ids carregam
+    apenas a chave primária (e a FK, nas relações reversas).
+    """
+    selection = selection or FieldSelection()
     queryset = Room.objects.all()
+    if selection.expands('department'):
+        queryset = queryset.select_related('department').prefetch_related('department__coordinators')
+    for relation in ROOM_M2M_RELATIONS:
+        if selection.expands(relation):
+            queryset = queryset.prefetch_related(relation)
+        elif selection.includes(relation):
+            field = Room._meta.get_field(relation)
+            columns = ['pk']
+            if field.one_to_many:
+                # Relação reversa (FK): o prefetch agrupa os objetos pela FK,
+                # que precisa vir junto para não virar uma consulta por objeto.
+                columns.append(field.field.name)
+            queryset = queryset.prefetch_related(Prefetch(relation, queryset=field.related_model.objects.only(*columns)))
+    return queryset
+
+
+def department_read_queryset(selection=None):
+    selection = selection or FieldSelection()
+    if selection.expands('coordinators'):
+        return Department.objects.prefetch_related('coordinators')
+    if selection.includes('coordinators'):
+        return Department.objects.prefetch_related(
+            Prefetch('coordinators', queryset=Department._meta.get_field('coordinators').related_model.objects.only('pk'))
+        )
+    return Department.objects.all()
+
+
+class RoomReadMixin:
+    def get_queryset(self):
+        return room_read_queryset(FieldSelection.from_request(self.request))
+
+
+class DepartmentReadMixin:
+    def get_queryset(self):
+        return department_read_queryset(FieldSelection.from_request(self.request))
+
+
+class VersionedReadMixin:
+    """
+    Leituras (GET) versionadas pelas versões de `cache_groups`:
+    - ETag e Last-Modified em toda resposta 200; um If-None-Match igual ao
+      ETag atual recebe 304 sem consultar o banco nem serializar;
+    - com `cache_responses`, a resposta serializada fica no cache.
+    Com `cache_per_user`, o usuário do token entra no ETag e na chave.
+    Com RESPONSE_CACHE_ENABLED desligado (sem cache compartilhado) não há
+    versões confiáveis: a leitura é sempre servida do banco, sem ETag.
+    As permissões da view já foram checadas quando get() é chamado.
+    """
+    cache_groups = (response_cache.ROOMS,)
+    cache_per_user = False
+    cache_responses = False
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache.enabled():
+            return super().get(request, *args, **kwargs)
+        user_id = None
+        if self.cache_per_user:
+            user_info = get_user_info_from_token(request)
+            user_id = user_info.get('user_id') if user_info else None
+            if not user_id:
+                return super().get(request, *args, **kwargs)
+        endpoint = request.resolver_match.url_name
+        versions, changed = response_cache.state(self.cache_groups)
+        digest = response_cache.fingerprint(request, versions, user_id)
+        etag = response_cache.etag(digest)
+
+        if response_cache.etag_matches(request.headers.get('If-None-Match'), etag):
+            response_cache.record(endpoint, 'not_modified')
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif self.cache_responses:
+            key = response_cache.response_key(endpoint, digest)
+            data = response_cache.get(endpoint, key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    response_cache.set(key, response.data)
+        else:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(changed)
+            if self.cache_per_user:
+                patch_vary_headers(response, ['Cookie'])
+        return response
+
+
+# --- Views de LEITURA ---
+
+class ListAllRoomsAPIView(VersionedReadMixin, RoomReadMixin, generics.ListAPIView):
+    cache_responses = True
     serializer_class = RoomSerializer
     permission_classes = [HasRole]
     allowed_roles = ['seguranca', 'administrador']
 
-class ListRoomsWithAccessAPIView(generics.ListAPIView):
+class ListRoomsWithAccessAPIView(VersionedReadMixin, generics.ListAPIView):
     serializer_class = RoomSerializer
+    cache_per_user = True
+    cache_responses = True
     def get_queryset(self):
         # MUDANÇA: Lendo o novo header 'X-Claim-User-Id'.
         user_info = get_user_info_from_token(self.request)
@@ -62,44 +172,92 @@ class ListRoomsWithAccessAPIView(generics.ListAPIView):
         user_id = user_info.get('user_id')
         if not user_id:
             return Room.objects.none()
-        return Room.objects.filter(
-            Q(admins__user_id=user_id) |
-            Q(users__user_id=user_id) |
-            Q(department__coordinators__user_id=user_id) |
-            Q(special_coordinators__user_id=user_id)
-        ).distinct()
-
-class ListAvailableRoomsAPIView(generics.ListAPIView):
-    queryset = Room.objects.filter(status=Room.RoomStatusChoices.DISPONIVEL)
+        # Uma busca no índice RoomAccess em vez de OR de quatro junções + distinct.
+        return rooms_for_user(user_id, queryset=room_read_queryset(FieldSelection.from_request(self.request)))
+
+class ListAvailableRoomsAPIView(VersionedReadMixin, RoomReadMixin, generics.ListAPIView):
+    cache_responses = True
     serializer_class = RoomSerializer
     permission_classes = []
+    def get_queryset(self):
+        return super().get_queryset().filter(status=Room.RoomStatusChoices.DISPONIVEL)
 
 # --- Views de ESCRITA (CRUD) ---
 
-class DepartmentListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Department.objects.all()
+class DepartmentListCreateAPIView(VersionedReadMixin, DepartmentReadMixin, generics.ListCreateAPIView):
+    cache_groups = (response_cache.DEPARTMENTS,)
+    cache_responses = True
     permission_classes = [HasRole]
     allowed_roles = ['administrador']
     def get_serializer_class(self):
         return DepartmentCreateUpdateSerializer if self.request.method == 'POST' else DepartmentSerializer
 
-class DepartmentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Department.objects.all()
+class DepartmentRetrieveUpdateDestroyAPIView(VersionedReadMixin, DepartmentReadMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_groups = (response_cache.DEPARTMENTS,)
     permission_classes = [HasRole]
     allowed_roles = ['administrador']
     def get_serializer_class(self):
         return DepartmentCreateUpdateSerializer if self.request.method in ['PUT', 'PATCH'] else DepartmentSerializer
 
-class RoomListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Room.objects.all()
+class RoomListCreateAPIView(VersionedReadMixin, RoomReadMixin, generics.ListCreateAPIView):
+    cache_responses = True
     permission_classes = [HasRole]
     allowed_roles = ['administrador', 'coordenador']
     def get_serializer_class(self):
         return RoomCreateUpdateSerializer if self.request.method == 'POST' else RoomSerializer
 
-class RoomRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Room.objects.all()
+class RoomRetrieveUpdateDestroyAPIView(VersionedReadMixin, RoomReadMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [HasRole]
     allowed_roles = ['administrador', 'coordenador']
     def get_serializer_class(self):
         return RoomCreateUpdateSerializer if self.request.method in ['PUT', 'PATCH'] else RoomSerializer
+
+# --- Views INTERNAS (serviço a serviço) ---
+
+class CheckPermissionAPIView(APIView):
+    """
+    Usado pelo Command Service: o usuário pode acionar o dispositivo?
+    Resolve MAC -> objeto IoT -> sala -> índice de acesso em uma única
+    consulta (busca pelo MAC no índice único + EXISTS em RoomAccess).
+    Respostas: 200 (permitido), 403 (negado) ou 404 (MAC desconhecido),
+    sempre com {'allowed', 'room_id'}.
+    """
+    permission_classes = [IsInternalService]
+
+    def get(self, request):
+        mac_address = request.query_params.get('mac_address')
+        try:
+            user_id = int(request.query_params.get('user_id'))
+        except (TypeError, ValueError):
+            return Response({'detail': "Parâmetro 'user_id' inválido."}, status=status.HTTP_400_BAD_REQUEST)
+        if not mac_address:
+            return Response({'detail': "Parâmetro 'mac_address' obrigatório."}, status=status.HTTP_400_BAD_REQUEST)
+
+        device = (
+            IOTObject.objects.filter(mac=mac_address)
+            .annotate(allowed=Exists(RoomAccess.objects.filter(room_id=OuterRef('room_id'), user_id=user_id)))
+            .values('room_id', 'allowed')
+            .first()
+        )
+        if device is None:
+            return Response({'allowed': False, 'room_id': None}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {'allowed': device['allowed'], 'room_id': device['room_id']},
+            status=status.HTTP_200_OK if device['allowed'] else status.HTTP_403_FORBIDDEN,
+        )
+
+
+class CacheStatsAPIView(APIView):
+    """Acertos/falhas do cache de respostas deste processo."""
+    permission_classes = [IsInternalService]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class PermissionStatsAPIView(APIView):
+    """Latência e resultados das verificações de HasRole deste processo, por view."""
+    permission_classes = [IsInternalService]
+
+    def get(self, request):
+        return Response(instrumentation.permission_stats())